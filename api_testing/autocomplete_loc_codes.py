@@ -2,25 +2,30 @@
 Get location codes for flight search
 """
 
-import requests, json
+import sys, os, json
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from skyscanner.client import auto_complete
+from skyscanner.places import get_places
 
-def api_call():
-    url = "https://sky-scanner3.p.rapidapi.com/flights/auto-complete"
 
-    querystring = {"query":"Mumbai, Delhi"}
-
-    headers = {
-      "x-rapidapi-key": "e48700ec66msh64ffb64e65d53a8p1d5a13jsn0f5339744b26",
-      "x-rapidapi-host": "sky-scanner3.p.rapidapi.com"
-    }
-
-    response = requests.get(url, headers=headers, params=querystring)
+def api_call(query="Mumbai, Delhi"):
+    response = auto_complete(query)
     json_str_response = json.dumps(response.json(), indent=2)
 
     return str(json_str_response)
 
 
+# Add the places in a response to the local index (skyscanner/places.json)
+def learn(json_str_response):
+    places = get_places()
+    count = places.learn(json.loads(json_str_response))
+    places.save()
+    return count
+
+
 if __name__ == "__main__":
+    result = api_call(*sys.argv[1:2])
     with open("autocomplete_loc_codes_output.json", "w") as file:
-        file.write(api_call())
+        file.write(result)
+    print(f"{learn(result)} places indexed")
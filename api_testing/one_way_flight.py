@@ -2,26 +2,20 @@
 One way flight API call
 """
 
-import requests, json
+import sys, os, json
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from skyscanner.client import search_one_way
 
-def api_call():
-    url = "https://sky-scanner3.p.rapidapi.com/flights/search-one-way"
-
-    querystring = {
-        "fromEntityId": "BOM",
-        "toEntityId": "DEL",
-        "departDate": "2024-07-17",
-        "cabinClass": "economy",
-        "currency": "INR",
-    }
 
-    headers = {
-        "x-rapidapi-key": "e48700ec66msh64ffb64e65d53a8p1d5a13jsn0f5339744b26",
-        "x-rapidapi-host": "sky-scanner3.p.rapidapi.com",
-    }
-
-    response = requests.get(url, headers=headers, params=querystring)
+def api_call():
+    response = search_one_way(
+        fromEntityId="BOM",
+        toEntityId="DEL",
+        departDate="2024-07-17",
+        cabinClass="economy",
+        currency="INR",
+    )
     json_str_response = json.dumps(response.json())
 
     return str(json_str_response)
@@ -0,0 +1,185 @@
+"""
+Compact search results into a ranked, token-budgeted table before they
+are handed to the summarisation call
+"""
+
+import os
+from assistant.tokens import estimate_tokens
+from skyscanner.results import Itinerary, format_results
+from skyscanner.fare_calendar import FareCalendar
+
+TOP_N = int(os.getenv("COMPACT_TOP_N", "8"))
+TOKEN_BUDGET = int(os.getenv("COMPACT_TOKEN_BUDGET", "400"))
+
+DATE_HEADER = "flights"
+MONTH_HEADER = "whole-month quotes"
+BATCH_HEADER = "flights across searches"
+DETAIL_HEADER = "flight details"
+# Booking sites listed per flight, cheapest first
+DETAIL_PRICES = int(os.getenv("COMPACT_DETAIL_PRICES", "3"))
+
+# Running totals across calls
+STATS = {"calls": 0, "raw_tokens": 0, "compact_tokens": 0, "tokens_saved": 0}
+
+
+def _itinerary_row(itinerary, with_carrier):
+    first, last = itinerary.legs[0], itinerary.legs[-1]
+    arrival = last.arrival[11:16]
+    if last.arrival[:10] != first.departure[:10]:
+        arrival += "+1"
+    row = [
+        str(round(itinerary.raw_price or 0)),
+        first.departure[11:16],
+        arrival,
+        str(sum(leg.duration for leg in itinerary.legs)),
+        "+".join(leg.flight_number for leg in itinerary.legs),
+        str(len(itinerary.legs) - 1),
+    ]
+    if with_carrier:
+        row.append("+".join(leg.carrier for leg in itinerary.legs))
+    return "|".join(row)
+
+
+def _price(quote):
+    return str(round(quote.raw_price)) if quote is not None else "-"
+
+
+def _day_row(day):
+    return "|".join((day.date, day.label[:3], _price(day.cheapest), _price(day.cheapest_direct)))
+
+
+def _table(items, whole_month):
+    if whole_month:
+        # One row per departure day, cheapest days first
+        calendar = FareCalendar(None, None, None)
+        calendar.update(items)
+        days = calendar.cheapest(len(calendar))
+        header = [f"{MONTH_HEADER} ({len(days)} days, cheapest first)"]
+        if items:
+            header.append(f"route: {items[0].origin} -> {items[0].destination}")
+        if days:
+            cheapest = f"cheapest day: {days[0].date} ({_price(days[0].cheapest)})"
+            best = calendar.cheapest(direct=True)
+            if best:
+                cheapest += f", cheapest direct: {best[0].date} ({_price(best[0].cheapest_direct)})"
+            header.append(cheapest)
+        header.append("date|day|price_inr|direct_price_inr")
+        return header, [_day_row(day) for day in days]
+
+    items = sorted(
+        items,
+        key=lambda i: (i.raw_price or 0, sum(leg.duration for leg in i.legs)),
+    )
+    carriers = sorted({leg.carrier for i in items for leg in i.legs})
+    header = [f"{DATE_HEADER} ({len(items)} found, cheapest then shortest first)"]
+    if items:
+        first = items[0]
+        route = f"route: {first.legs[0].origin} -> {first.legs[-1].destination} on {first.legs[0].departure[:10]}"
+        if len(carriers) == 1:
+            route += f", carrier: {carriers[0]}"
+        header.append(route)
+    with_carrier = len(carriers) > 1
+    header.append("price_inr|dep|arr|dur_min|flight|stops" + ("|carrier" if with_carrier else ""))
+    return header, [_itinerary_row(i, with_carrier) for i in items]
+
+
+def compact_results(
+    items, departDate=None, wholeMonthDepart=None, top_n=TOP_N, budget=TOKEN_BUDGET
+):
+    """
+    Rank parsed Itinerary/Quote objects, keep the best `top_n` and render
+    them as a pipe-separated table, dropping rows until it fits `budget`
+    tokens. Returns (text, stats) where stats compares against the JSON
+    that format_results would have sent.
+    """
+    if items:
+        whole_month = not isinstance(items[0], Itinerary)
+    else:
+        whole_month = not ((wholeMonthDepart is None) and (departDate is not None))
+    header, rows = _table(items, whole_month)
+    text, rows = _fit(header, rows, top_n, budget)
+
+    raw_tokens = estimate_tokens(format_results(items, departDate, wholeMonthDepart))
+    compact_tokens = estimate_tokens(text)
+    stats = {
+        "raw_tokens": raw_tokens,
+        "compact_tokens": compact_tokens,
+        "tokens_saved": raw_tokens - compact_tokens,
+        "rows": len(rows),
+    }
+    STATS["calls"] += 1
+    for k in ("raw_tokens", "compact_tokens", "tokens_saved"):
+        STATS[k] += stats[k]
+    return text, stats
+
+
+def _fit(header, rows, top_n, budget):
+    rows = rows[:top_n]
+    text = "\n".join(header + rows)
+    while rows and estimate_tokens(text) > budget:
+        rows.pop()
+        text = "\n".join(header + rows)
+    return text, rows
+
+
+def compact_batch(batch, top_n=TOP_N, budget=TOKEN_BUDGET):
+    """
+    Same table for a skyscanner.batch.BatchResult, with date and route
+    columns since the rows come from several searches. Returns (text, stats).
+    """
+    carriers = {leg.carrier for _, i in batch.items for leg in i.legs}
+    with_carrier = len(carriers) > 1
+    header = [
+        f"{BATCH_HEADER} ({len(batch.items)} found in {len(batch.searches)} searches, "
+        "cheapest then shortest first)"
+    ]
+    if len(carriers) == 1:
+        header.append(f"carrier: {next(iter(carriers))}")
+    if batch.errors:
+        failed = ", ".join(
+            f"{p['fromEntityId']}-{p['toEntityId']} {p['departDate']}" for p, _ in batch.errors
+        )
+        header.append(f"failed searches: {failed}")
+    header.append(
+        "date|route|price_inr|dep|arr|dur_min|flight|stops" + ("|carrier" if with_carrier else "")
+    )
+    rows = [
+        f"{p['departDate']}|{p['fromEntityId']}-{p['toEntityId']}|{_itinerary_row(i, with_carrier)}"
+        for p, i in batch.items
+    ]
+    text, rows = _fit(header, rows, top_n, budget)
+    stats = {"searches": len(batch.searches), "errors": len(batch.errors), "found": len(batch.items), "rows": len(rows)}
+    return text, stats
+
+
+def _clock(stamp, day):
+    return stamp[11:16] + ("+1" if stamp[:10] != day else "")
+
+
+def compact_detail(detail, prices=DETAIL_PRICES):
+    """A skyscanner.details.Detail as a short segment table plus layovers, fares and notes."""
+    first, last = detail.segments[0], detail.segments[-1]
+    day = first.departure[:10]
+    lines = [
+        f"{DETAIL_HEADER}: {first.origin} -> {last.destination} on {day}, "
+        f"{detail.stops} stop(s), {detail.duration} min",
+        "flight|from|to|dep|arr|dur_min|carrier|operated_by",
+    ]
+    for seg in detail.segments:
+        lines.append(
+            "|".join(
+                (
+                    seg.flight_number, seg.origin, seg.destination, _clock(seg.departure, day),
+                    _clock(seg.arrival, day), str(seg.duration), seg.carrier or "-", seg.operator or "-",
+                )
+            )
+        )
+    layovers = detail.layovers()
+    lines.append(
+        "layovers: " + (", ".join(f"{airport} {round(minutes)} min" for airport, minutes in layovers) if layovers else "none")
+    )
+    if detail.prices:
+        lines.append("fares: " + ", ".join(f"{agent} {round(price)}" for agent, price in detail.prices[:prices]))
+    if detail.notes:
+        lines.append("notes: " + "; ".join(detail.notes))
+    return "\n".join(lines)
@@ -0,0 +1,102 @@
+"""
+Run the tool calls of one model turn concurrently
+"""
+
+import os, time, asyncio, contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from langchain_core.messages import ToolMessage
+from skyscanner.quota import describe
+
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "30"))
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+
+
+def _error_message(tool_call, error):
+    return ToolMessage(
+        content=f"Error: {describe(error)}", tool_call_id=tool_call["id"], name=tool_call["name"]
+    )
+
+
+def _select(tools, tool_call):
+    name = tool_call["name"].lower()
+    if name not in tools:
+        raise ValueError(f"unknown tool {tool_call['name']}")
+    return tools[name]
+
+
+def _timed_invoke(tools, tool_call, starts=None, index=None):
+    start = time.perf_counter()
+    if starts is not None:
+        starts[index] = start
+    try:
+        msg = _select(tools, tool_call).invoke(tool_call)
+    except Exception as e:
+        msg = _error_message(tool_call, e)
+    return msg, time.perf_counter() - start
+
+
+def run_tool_calls(tool_calls, tools, timeout=TOOL_TIMEOUT):
+    """
+    Invoke every tool call on the shared thread pool, giving each at most
+    `timeout` seconds from when a worker picks it up. Returns (ToolMessages
+    in the original call order, [(tool name, seconds)]). Calls that fail or
+    time out come back as "Error: ..." ToolMessages so the model can still
+    answer.
+    """
+    start = time.perf_counter()
+    starts = [None] * len(tool_calls)
+    # Copy the caller's context so tool spans nest under the current one
+    futures = [
+        _executor.submit(contextvars.copy_context().run, _timed_invoke, tools, c, starts, i)
+        for i, c in enumerate(tool_calls)
+    ]
+    # A call still queued once every batch ahead of it could have run out its timeout gives up
+    ceiling = start + timeout * -(-len(tool_calls) // TOOL_WORKERS)
+    results = {}
+    pending = set(range(len(tool_calls)))
+    while pending:
+        deadlines = [starts[i] + timeout for i in pending if starts[i] is not None]
+        wait(
+            [futures[i] for i in pending],
+            timeout=max(min(deadlines + [ceiling]) - time.perf_counter(), 0),
+            return_when=FIRST_COMPLETED,
+        )
+        now = time.perf_counter()
+        for i in list(pending):
+            if futures[i].done():
+                results[i] = futures[i].result()
+            elif starts[i] is not None and now >= starts[i] + timeout:
+                # A running thread can't be interrupted, its result is discarded
+                results[i] = (_error_message(tool_calls[i], f"timed out after {timeout}s"), now - starts[i])
+            elif starts[i] is None and now >= ceiling:
+                futures[i].cancel()
+                results[i] = (_error_message(tool_calls[i], "timed out waiting for a free worker"), 0.0)
+            else:
+                continue
+            pending.discard(i)
+    messages = [results[i][0] for i in range(len(tool_calls))]
+    timings = [(c["name"], round(results[i][1], 3)) for i, c in enumerate(tool_calls)]
+    return messages, timings
+
+
+async def arun_tool_calls(tool_calls, tools, timeout=TOOL_TIMEOUT):
+    """Asyncio counterpart of run_tool_calls for the chat engine."""
+
+    async def run(tool_call):
+        start = time.perf_counter()
+        try:
+            msg = await asyncio.wait_for(
+                _select(tools, tool_call).ainvoke(tool_call), timeout
+            )
+        except asyncio.TimeoutError:
+            msg = _error_message(tool_call, f"timed out after {timeout}s")
+        except Exception as e:
+            msg = _error_message(tool_call, e)
+        return msg, time.perf_counter() - start
+
+    results = await asyncio.gather(*(run(c) for c in tool_calls))
+    messages = [msg for msg, _ in results]
+    timings = [(c["name"], round(t, 3)) for c, (_, t) in zip(tool_calls, results)]
+    return messages, timings
@@ -0,0 +1,184 @@
+"""
+Asyncio chat engine: one ChatSession per conversation, many conversations
+multiplexed on a single event loop.
+
+Run a console session with `python -m assistant.engine [gemini|ollama|router]`.
+"""
+
+import sys, os, time, asyncio
+from assistant.warmup import startup, warm_ollama, Preload, OLLAMA_KEEP_ALIVE, STARTUP_REPORT
+from dotenv import load_dotenv
+from assistant.prompts import SYSTEM_PROMPTS, wrap_tool_result
+from assistant.tools import TOOLS
+from assistant.dispatch import arun_tool_calls
+from assistant.memory import ConversationMemory
+from assistant.telemetry import span, record_llm, serve
+from assistant.streaming import ConsolePrinter, astream_message
+from assistant.prefetch import get_prefetcher
+from assistant.llm_cache import model_id, cached_astream, at_temperature_zero
+from skyscanner import capture
+from skyscanner.details import get_details
+
+load_dotenv()
+
+# Concurrent in-flight LLM calls per upstream
+LLM_CONCURRENCY = {
+    "gemini": int(os.getenv("GEMINI_MAX_CONCURRENCY", "32")),
+    "ollama": int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4")),
+    "router": int(os.getenv("ROUTER_MAX_CONCURRENCY", "32")),
+}
+
+
+def make_llm(backend):
+    if backend == "gemini":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        return ChatGoogleGenerativeAI(
+            api_key=f"{os.getenv('GEMINI_API_KEY')}",
+            base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
+            model="gemini-2.0-flash",
+        )
+    if backend == "ollama":
+        from langchain_ollama.chat_models import ChatOllama
+
+        return ChatOllama(model="llama3.1", keep_alive=OLLAMA_KEEP_ALIVE)
+    if backend == "router":
+        from assistant.router import RoutedChatModel
+
+        return RoutedChatModel(backends={"gemini": make_llm("gemini"), "ollama": make_llm("ollama")})
+    raise ValueError(f"Unknown backend: {backend}")
+
+
+def warm_llm(llm):
+    """Load a local model before the first turn needs it; hosted models have nothing to load."""
+    if type(llm).__name__ == "ChatOllama":
+        warm_ollama(llm.model, llm.base_url)
+    for backend in getattr(llm, "backends", {}).values():
+        warm_llm(backend)
+
+
+class ChatSession:
+    """History and turn handling for one conversation."""
+
+    def __init__(self, engine, session_id):
+        self.engine = engine
+        self.session_id = session_id
+        self.memory = ConversationMemory(SYSTEM_PROMPTS[engine.backend], summarizer=engine.llm)
+        # Turns of one conversation run in order, other sessions are unaffected
+        self.lock = asyncio.Lock()
+        self.last_tool_timings = []
+        # Seconds spent per stage of the last turn: memory, extraction, search, summarization, total
+        self.last_timings = {}
+
+    async def turn(self, text, on_token=None):
+        """
+        Run one user turn and return the reply text. Model output is
+        streamed, each text delta goes to `on_token` as it arrives.
+        """
+        async with self.lock:
+            timings = {}
+            with span("chat.turn", {"session.id": self.session_id}) as turn, capture.session(self.session_id):
+                with span("chat.memory") as stage:
+                    await self.memory.aadd_user(text)
+                timings["memory"] = stage.duration
+
+                prompt = self.memory.prompt()
+                with span("chat.extraction") as stage:
+                    ai_msg = await astream_message(self.engine.astream(prompt, "extraction"), on_token)
+                    record_llm(stage, prompt, ai_msg)
+                self.memory.append(ai_msg)
+                timings["extraction"] = stage.duration
+
+                result = ai_msg
+                prefetcher = get_prefetcher()
+                if not ai_msg.tool_calls and prefetcher is not None:
+                    # A confirmation question: search while the user reads it
+                    turn.set("chat.prefetch", prefetcher.prefetch_task(ai_msg.content) is not None)
+                if ai_msg.tool_calls:
+                    with span("chat.search") as stage:
+                        tool_msgs, self.last_tool_timings = await arun_tool_calls(
+                            ai_msg.tool_calls, TOOLS
+                        )
+                        for tool_msg in tool_msgs:
+                            tool_msg.content = wrap_tool_result(self.engine.backend, tool_msg.content)
+                            self.memory.append(tool_msg)
+                    timings["search"] = stage.duration
+
+                    prompt = self.memory.prompt()
+                    with span("chat.summarization") as stage:
+                        result = await astream_message(self.engine.astream(prompt, "summarization"), on_token)
+                        record_llm(stage, prompt, result)
+                    self.memory.append(result)
+                    timings["summarization"] = stage.duration
+            timings["total"] = turn.duration
+            self.last_timings = timings
+            return result.content
+
+
+class ChatEngine:
+    """
+    Owns the tool-bound model and the per-upstream limiter. RapidAPI
+    concurrency is bounded separately inside the async Skyscanner client.
+    """
+
+    def __init__(self, backend="gemini", llm=None, max_concurrency=None):
+        self.backend = backend
+        self.llm = llm or make_llm(backend)
+        self.llm_with_tools = self.llm.bind_tools(list(TOOLS.values()))
+        # Extraction runs at temperature 0 so its replies can be cached, summaries keep the model's own
+        self.extractor = at_temperature_zero(self.llm).bind_tools(list(TOOLS.values()))
+        self.models = {"extraction": model_id(self.extractor), "summarization": model_id(self.llm_with_tools)}
+        self.limiter = asyncio.Semaphore(max_concurrency or LLM_CONCURRENCY[backend])
+        self.sessions = {}
+
+    async def ainvoke(self, messages):
+        async with self.limiter:
+            return await self.llm_with_tools.ainvoke(messages)
+
+    def astream(self, messages, stage=None):
+        """Stream a reply, from the LLM response cache when this prompt was answered before."""
+        llm = self.extractor if stage == "extraction" else self.llm_with_tools
+        return cached_astream(self.models.get(stage), messages, lambda: self._astream(llm, messages), stage)
+
+    async def _astream(self, llm, messages):
+        async with self.limiter:
+            async for chunk in llm.astream(messages):
+                yield chunk
+
+    def session(self, session_id):
+        if session_id not in self.sessions:
+            self.sessions[session_id] = ChatSession(self, session_id)
+        return self.sessions[session_id]
+
+    async def chat(self, session_id, text, on_token=None):
+        return await self.session(session_id).turn(text, on_token)
+
+    def end(self, session_id):
+        self.sessions.pop(session_id, None)
+        with capture.session(session_id):
+            get_details().forget()
+
+
+async def main(backend="gemini"):
+    startup.since_start("imports")
+    # The model client is built (and Ollama's model loaded) while the user types
+    engine = Preload(lambda: ChatEngine(backend), warm=lambda engine: warm_llm(engine.llm))
+    engine.start()
+    serve()
+    print("|> Hello. I am a travel planning assistant. How can I help you today?")
+    startup.since_start("ready")
+    while True:
+        query = await asyncio.to_thread(input, ">> ")
+        if query.lower() == "exit":
+            break
+        printer = ConsolePrinter()
+        start = time.perf_counter()
+        await (await engine.aget()).chat("console", query, on_token=printer)
+        printer.finish()
+        if startup.first_turn(time.perf_counter() - start) and STARTUP_REPORT:
+            print(f"[startup] {startup.summary()}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    os.system("cls")
+    asyncio.run(main(*sys.argv[1:2]))
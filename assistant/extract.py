@@ -0,0 +1,169 @@
+"""
+Rule-based fast path for pulling search parameters out of a user message.
+
+Queries naming two known cities and one unambiguous date or month are
+answered without a model round-trip; anything else falls back to the LLM.
+"""
+
+import os, re, datetime
+from collections import Counter
+from skyscanner.places import get_places
+
+CONFIDENCE_THRESHOLD = float(os.getenv("FAST_PATH_CONFIDENCE", "0.9"))
+
+# skyId -> city names and aliases, from the local place index
+CITY_ALIASES = get_places().aliases()
+
+MONTHS = (
+    "january", "february", "march", "april", "may", "june",
+    "july", "august", "september", "october", "november", "december",
+)
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+_MONTH_NAME = r"(" + "|".join(m[:3] + r"(?:" + m[3:] + r")?" for m in MONTHS) + r")\.?"
+_ALIAS_TO_CODE = {alias: code for code, aliases in CITY_ALIASES.items() for alias in aliases}
+
+_CITY = re.compile(
+    r"\b(" + "|".join(sorted(map(re.escape, _ALIAS_TO_CODE), key=len, reverse=True)) + r")\b"
+)
+_CODE = re.compile(r"\b(" + "|".join(CITY_ALIASES) + r")\b")
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+_NUMERIC_DATE = re.compile(r"\b(\d{1,2})[/.-](\d{1,2})(?:[/.-](\d{2,4}))?\b")
+_DAY_MONTH = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?(?: of)? " + _MONTH_NAME + r"(?:,? (\d{4}))?\b")
+_MONTH_DAY = re.compile(r"\b" + _MONTH_NAME + r" (\d{1,2})(?:st|nd|rd|th)?(?:,? (\d{4}))?\b")
+_RELATIVE_DAY = re.compile(r"\b(day after tomorrow|tomorrow|today|tonight)\b")
+_WEEKDAY = re.compile(r"\b(?:(next|this|coming) )?(" + "|".join(WEEKDAYS) + r")\b")
+_RELATIVE_MONTH = re.compile(r"\b(this|next) month\b")
+# A bare month name only counts with a cue, "may" and "march" are also verbs
+_MONTH = re.compile(
+    r"\b(?:in|for|during|of|whole|entire|throughout|month) (?:the month of )?"
+    + _MONTH_NAME
+    + r"(?: (\d{4}))?\b|\b"
+    + _MONTH_NAME
+    + r" (\d{4})\b"
+)
+_HEDGES = re.compile(r"\b(or|not|except|instead|either|between|return|round trip)\b")
+
+# Which path each query took: "rules" or "llm"
+PATH_COUNTS = Counter()
+
+
+def _month_number(name):
+    return MONTHS.index(next(m for m in MONTHS if m.startswith(name[:3]))) + 1
+
+
+def _upcoming(today, month, day, year=None):
+    """The date with this month/day on or after today when no year is given."""
+    if year:
+        return datetime.date(int(year) if len(year) == 4 else 2000 + int(year), month, day)
+    candidate = datetime.date(today.year, month, day)
+    if candidate < today:
+        candidate = datetime.date(today.year + 1, month, day)
+    return candidate
+
+
+def _find_cities(text, original):
+    found = [(m.start(), _ALIAS_TO_CODE[m.group(1)]) for m in _CITY.finditer(text)]
+    found += [(m.start(), m.group(1)) for m in _CODE.finditer(original)]
+    found.sort()
+    codes = []
+    for pos, code in found:
+        if code not in (c for _, c in codes):
+            codes.append((pos, code))
+    return codes
+
+
+def _order_cities(text, cities):
+    """Use "from X" / "to Y" cues when present, otherwise mention order."""
+    (pos_a, a), (pos_b, b) = cities
+    before_b = text[:pos_b].rstrip()
+    before_a = text[:pos_a].rstrip()
+    if before_a.endswith(" to") or before_a == "to" or before_b.endswith("from"):
+        return b, a
+    return a, b
+
+
+def _find_dates(text, today):
+    """Return ([departDate], [wholeMonthDepart]) found in the text."""
+    dates, months = [], []
+    rest = text
+    try:
+        for m in _ISO_DATE.finditer(rest):
+            dates.append(datetime.date(int(m.group(1)), int(m.group(2)), int(m.group(3))))
+        rest = _ISO_DATE.sub(" ", rest)
+        for m in _DAY_MONTH.finditer(rest):
+            dates.append(_upcoming(today, _month_number(m.group(2)), int(m.group(1)), m.group(3)))
+        rest = _DAY_MONTH.sub(" ", rest)
+        for m in _MONTH_DAY.finditer(rest):
+            dates.append(_upcoming(today, _month_number(m.group(1)), int(m.group(2)), m.group(3)))
+        rest = _MONTH_DAY.sub(" ", rest)
+        for m in _NUMERIC_DATE.finditer(rest):
+            # Day first, as written in India
+            dates.append(_upcoming(today, int(m.group(2)), int(m.group(1)), m.group(3)))
+        rest = _NUMERIC_DATE.sub(" ", rest)
+    except ValueError:
+        return None, None
+    for m in _RELATIVE_DAY.finditer(rest):
+        offset = {"today": 0, "tonight": 0, "tomorrow": 1, "day after tomorrow": 2}[m.group(1)]
+        dates.append(today + datetime.timedelta(days=offset))
+    for m in _WEEKDAY.finditer(rest):
+        ahead = (WEEKDAYS.index(m.group(2)) - today.weekday()) % 7
+        # Said on that weekday, "next friday" is a week out; "friday", "this friday"
+        # and "coming friday" mean today
+        if ahead == 0 and m.group(1) == "next":
+            ahead = 7
+        dates.append(today + datetime.timedelta(days=ahead))
+    for m in _RELATIVE_MONTH.finditer(rest):
+        year, month = today.year, today.month + (m.group(1) == "next")
+        if month > 12:
+            year, month = year + 1, 1
+        months.append(f"{year}-{month:02d}")
+    for m in _MONTH.finditer(rest):
+        name, year = (m.group(1), m.group(2)) if m.group(1) else (m.group(3), m.group(4))
+        month = _month_number(name)
+        if not year:
+            year = today.year if month >= today.month else today.year + 1
+        months.append(f"{year}-{month:02d}")
+    return dates, months
+
+
+def extract_params(text, today=None):
+    """
+    Return (params, confidence). params uses the same keys the LLM
+    extraction produces; confidence is 1.0 only when both cities and exactly
+    one date or month were found with nothing hedging them.
+    """
+    today = today or datetime.date.today()
+    original = text
+    text = re.sub(r"[^\w/.\- ]", " ", text.lower())
+    text = re.sub(r"\s+", " ", text).strip()
+
+    cities = _find_cities(text, original)
+    dates, months = _find_dates(text, today)
+    if dates is None or len(cities) < 2:
+        return None, 0.0
+
+    params = {"locale": "", "currency": "INR"}
+    params["fromEntityId"], params["toEntityId"] = _order_cities(text, cities[:2])
+    confidence = 1.0
+    if len(cities) > 2:
+        confidence -= 0.5
+    if _HEDGES.search(text):
+        confidence -= 0.3
+    if len(set(dates)) == 1 and not months:
+        if dates[0] < today:
+            confidence -= 0.5
+        params["departDate"] = dates[0].isoformat()
+    elif len(set(months)) == 1 and not dates:
+        params["wholeMonthDepart"] = months[0]
+    else:
+        confidence -= 0.5
+    return params, max(confidence, 0.0)
+
+
+def fast_path(text, today=None, threshold=CONFIDENCE_THRESHOLD):
+    """Params when the rules are confident, None to send the query to the LLM."""
+    params, confidence = extract_params(text, today)
+    path = "rules" if params is not None and confidence >= threshold else "llm"
+    PATH_COUNTS[path] += 1
+    return params if path == "rules" else None
@@ -0,0 +1,80 @@
+"""
+Answer whole-month fare questions ("cheapest direct day in May", "any day
+under ₹4,000") with a fare calendar lookup instead of a summarisation call
+"""
+
+import os, re, datetime
+from skyscanner.fare_calendar import calendar_for
+
+# Days listed in a lookup answer
+ANSWER_DAYS = int(os.getenv("FARE_ANSWER_DAYS", "5"))
+
+_UNDER = re.compile(
+    r"\b(?:under|below|less than|cheaper than|within|up ?to|at most|max(?:imum)?(?: of)?)\s*"
+    r"(?:₹|rs\.?|inr)?\s*(\d[\d,]*(?:\.\d+)?)\s*(k\b)?",
+    re.IGNORECASE,
+)
+_CHEAPEST = re.compile(r"\b(cheapest|lowest|least expensive|best (?:fare|price|day))\b", re.IGNORECASE)
+_DIRECT = re.compile(r"\b(direct|non-?stop)\b", re.IGNORECASE)
+
+
+def parse_fare_question(text):
+    """{"direct", "max_price"} when the message asks for the cheapest or an under-price day, else None."""
+    under = _UNDER.search(text)
+    if under is None and _CHEAPEST.search(text) is None:
+        return None
+    max_price = None
+    if under is not None:
+        max_price = float(under.group(1).replace(",", "")) * (1000 if under.group(2) else 1)
+    return {"direct": _DIRECT.search(text) is not None, "max_price": max_price}
+
+
+def _fare(day, direct):
+    quote = day.cheapest_direct if direct else day.cheapest
+    return f"{day.label} at {quote.price}"
+
+
+def answer(calendar, direct=False, max_price=None, limit=ANSWER_DAYS):
+    """A short plain-text answer from the calendar."""
+    kind = "direct " if direct else ""
+    month = datetime.datetime.strptime(calendar.month, "%Y-%m").strftime("%B %Y")
+    route = f"{calendar.origin} to {calendar.destination} in {month}"
+    cheapest = calendar.cheapest(limit, direct)
+    if not cheapest:
+        return f"There are no {kind}fares for {route}."
+    if max_price is None:
+        text = f"The cheapest {kind}day to fly {route} is {_fare(cheapest[0], direct)}."
+        if len(cheapest) > 1:
+            text += " Other low fares: " + "; ".join(_fare(d, direct) for d in cheapest[1:]) + "."
+        return text
+    days = calendar.under(max_price, direct)
+    if not days:
+        return (
+            f"No {kind}fares for {route} are at or under ₹{max_price:,.0f}; "
+            f"the cheapest is {_fare(cheapest[0], direct)}."
+        )
+    text = f"{len(days)} {kind}day{'s' if len(days) > 1 else ''} for {route} at or under ₹{max_price:,.0f}: "
+    text += "; ".join(_fare(d, direct) for d in days[:limit])
+    if len(days) > limit:
+        text += f" and {len(days) - limit} more"
+    return text + "."
+
+
+def fare_answer(params, text, search):
+    """
+    The calendar answer for a whole-month fare question, or None to take
+    the normal path. `search(params)` is called to fill a missing or
+    stale calendar.
+    """
+    if not params.get("wholeMonthDepart"):
+        return None
+    question = parse_fare_question(text)
+    if question is None:
+        return None
+    calendar = calendar_for(params)
+    if calendar is None:
+        search(params)
+        calendar = calendar_for(params)
+    if calendar is None:
+        return None
+    return answer(calendar, **question)
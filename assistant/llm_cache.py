@@ -0,0 +1,227 @@
+"""
+Response cache for model calls. A prompt seen before (same model and
+tools, same conversation up to case and spacing of the user's words, same
+tool output) is answered from memory instead of another round-trip.
+
+Keys include today's date, so a cached reading of "tomorrow" or "this
+Friday" is never served on a later day.
+"""
+
+import os, json, time, uuid, hashlib, datetime, threading
+from collections import Counter, OrderedDict
+from langchain_core.messages import AIMessageChunk, BaseMessage, BaseMessageChunk
+from langchain_core.messages.utils import message_chunk_to_message
+from assistant import telemetry
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+# Only temperature-0 calls are cached unless this is set: a sampled reply is one draw, not the answer
+LLM_CACHE_SAMPLED = os.getenv("LLM_CACHE_SAMPLED", "0") != "0"
+
+LOOKUPS = telemetry.Counter("llm_cache_lookups_total", "LLM response cache lookups by stage and outcome: hit, miss")
+
+
+def cache_model(name, temperature=None):
+    """name when calls at this temperature may be cached, else None (caching off for them)."""
+    return name if temperature == 0 or LLM_CACHE_SAMPLED else None
+
+
+def at_temperature_zero(llm):
+    """
+    A copy of a chat model (of every backend, for a routed one) that samples
+    at temperature 0. Used for the extraction stage, where a message has one
+    right set of search parameters, so that its replies can be cached.
+    """
+    if hasattr(llm, "backends"):
+        return llm.model_copy(
+            update={"backends": {name: at_temperature_zero(backend) for name, backend in llm.backends.items()}}
+        )
+    return llm.model_copy(update={"temperature": 0})
+
+
+def _unbind(llm):
+    bound = {}
+    while hasattr(llm, "bound"):
+        bound.update(getattr(llm, "kwargs", {}))
+        llm = llm.bound
+    return llm, bound
+
+
+def _deterministic(llm):
+    llm, bound = _unbind(llm)
+    if hasattr(llm, "backends"):
+        return all(_deterministic(backend) for backend in llm.backends.values())
+    return bound.get("temperature", getattr(llm, "temperature", None)) == 0
+
+
+def model_id(llm):
+    """
+    Model class and name plus a digest of bound kwargs (tools), for cache
+    keys; None for a sampling model (see cache_model).
+    """
+    if not (LLM_CACHE_SAMPLED or _deterministic(llm)):
+        return None
+    llm, bound = _unbind(llm)
+    name = getattr(llm, "model", None) or getattr(llm, "model_name", None) or ""
+    digest = hashlib.sha1(json.dumps(bound, sort_keys=True, default=str).encode()).hexdigest()[:12]
+    return f"{type(llm).__name__}:{name}:{digest}"
+
+
+def _text(content):
+    return content if isinstance(content, str) else json.dumps(content, sort_keys=True, default=str)
+
+
+def normalize_message(message):
+    """
+    (role, content) with the user's words lowercased and re-spaced, tool
+    output reduced to a fingerprint and tool calls stripped of their ids.
+    """
+    if isinstance(message, BaseMessage):
+        role, content = message.type, _text(message.content)
+        calls = [(c["name"], json.dumps(c["args"], sort_keys=True)) for c in getattr(message, "tool_calls", None) or ()]
+    else:
+        role, content, calls = message["role"], _text(message["content"]), []
+    if role in ("human", "user"):
+        content = " ".join(content.lower().split()).rstrip(".!? ")
+    elif role == "tool":
+        content = hashlib.sha1(content.encode()).hexdigest()
+    else:
+        content = " ".join(content.split())
+    return [role, content, calls] if calls else [role, content]
+
+
+def cache_key(model, messages, today=None):
+    today = today or datetime.date.today()
+    body = json.dumps([model, today.isoformat(), [normalize_message(m) for m in messages]])
+    return hashlib.sha1(body.encode()).hexdigest()
+
+
+def _replay(value):
+    """A cached reply as the one chunk a stream would have produced."""
+    if not isinstance(value, BaseMessage):
+        return value
+    return AIMessageChunk(
+        content=value.content,
+        tool_call_chunks=[
+            # Fresh ids: the tool messages answering them go into history
+            {"name": call["name"], "args": json.dumps(call["args"]), "id": str(uuid.uuid4()), "index": i}
+            for i, call in enumerate(value.tool_calls or ())
+        ],
+        response_metadata={"cached": True},
+    )
+
+
+def _merge(chunks):
+    if chunks and isinstance(chunks[0], BaseMessage):
+        # Models without streaming yield their whole reply as one message
+        merged = chunks[0]
+        for chunk in chunks[1:]:
+            merged = merged + chunk
+        return message_chunk_to_message(merged) if isinstance(merged, BaseMessageChunk) else merged
+    return "".join(chunk for chunk in chunks if chunk)
+
+
+class LLMCache:
+    """
+    TTL + LRU map from cache_key() to the finished reply: an AIMessage for
+    chat models, a string for completion-style ones. Replies only go in
+    once a call has finished, a failed or abandoned stream stores nothing.
+    """
+
+    def __init__(self, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = Counter()
+        self._entries = OrderedDict()  # key -> (expires, reply)
+        self._lock = threading.Lock()
+
+    def get(self, key, stage=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        outcome = "miss" if entry is None else "hit"
+        self.stats[outcome] += 1
+        LOOKUPS.inc(stage=stage or "", outcome=outcome)
+        return None if entry is None else entry[1]
+
+    def put(self, key, reply):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, reply)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def call(self, model, messages, fn, stage=None):
+        """fn() unless this prompt has a cached reply."""
+        key = cache_key(model, messages)
+        reply = self.get(key, stage)
+        if reply is None:
+            reply = fn()
+            self.put(key, reply)
+        return reply
+
+    def stream(self, model, messages, fn, stage=None):
+        """Chunks of fn() (a stream of message chunks or text deltas), or the cached reply as one chunk."""
+        key = cache_key(model, messages)
+        reply = self.get(key, stage)
+        if reply is not None:
+            yield _replay(reply)
+            return
+        chunks = []
+        for chunk in fn():
+            chunks.append(chunk)
+            yield chunk
+        if chunks:
+            self.put(key, _merge(chunks))
+
+    async def astream(self, model, messages, fn, stage=None):
+        """Async counterpart of stream for `.astream()` iterators."""
+        key = cache_key(model, messages)
+        reply = self.get(key, stage)
+        if reply is not None:
+            yield _replay(reply)
+            return
+        chunks = []
+        async for chunk in fn():
+            chunks.append(chunk)
+            yield chunk
+        if chunks:
+            self.put(key, _merge(chunks))
+
+
+_cache = None
+_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """The process-wide cache, or None when LLM_CACHE=0."""
+    global _cache
+    if _cache is None and LLM_CACHE_ENABLED:
+        with _lock:
+            if _cache is None:
+                _cache = LLMCache()
+    return _cache
+
+
+def cached_stream(model, messages, fn, stage=None):
+    """
+    LLMCache.stream on the shared cache; a plain fn() when caching is off
+    or model is None (a sampling model, see model_id and cache_model).
+    """
+    cache = get_llm_cache()
+    return fn() if cache is None or model is None else cache.stream(model, messages, fn, stage)
+
+
+def cached_astream(model, messages, fn, stage=None):
+    cache = get_llm_cache()
+    return fn() if cache is None or model is None else cache.astream(model, messages, fn, stage)
+
+
+def cached_call(model, messages, fn, stage=None):
+    cache = get_llm_cache()
+    return fn() if cache is None or model is None else cache.call(model, messages, fn, stage)
@@ -0,0 +1,139 @@
+"""
+Bounded conversation memory: recent turns verbatim, older turns folded
+into a running summary, stale tool output cut down to its header line
+"""
+
+import os
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+from assistant.tokens import estimate_tokens
+from assistant.prompts import unwrap_tool_result
+
+KEEP_TURNS = int(os.getenv("MEMORY_KEEP_TURNS", "4"))
+MAX_TOKENS = int(os.getenv("MEMORY_MAX_TOKENS", "3000"))
+SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "300"))
+
+SUMMARY_PROMPT = """You maintain a running summary of a flight booking chat.
+Merge the new dialogue into the summary. Keep the user's cities, dates, months,
+chosen flights and open questions; drop greetings and flight listings.
+Reply with the updated summary only, in under {words} words."""
+
+
+def message_tokens(message):
+    tokens = estimate_tokens(str(message.content))
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        tokens += estimate_tokens(str(tool_call["args"]))
+    return tokens
+
+
+def stub_tool_message(message):
+    """Keep only the header line of a tool result the user has moved on from."""
+    # The summarisation instruction in front of it is stale by now, and is not the header
+    header = unwrap_tool_result(str(message.content)).split("\n", 1)[0][:200]
+    return message.model_copy(update={"content": f"{header} (details omitted)"})
+
+
+class ConversationMemory:
+    """
+    Drop-in for the module-level `messages` list. Call add_user() (or
+    aadd_user() from async code) at the start of each turn, append() for
+    model and tool messages, and send prompt() to the model.
+    """
+
+    def __init__(
+        self,
+        system_prompt,
+        summarizer=None,
+        keep_turns=KEEP_TURNS,
+        max_tokens=MAX_TOKENS,
+        summary_tokens=SUMMARY_TOKENS,
+    ):
+        self.system_prompt = system_prompt
+        self.summarizer = summarizer
+        self.keep_turns = keep_turns
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.summary = ""
+        self.history = []
+        self.folded_turns = 0
+
+    def append(self, message):
+        self.history.append(message)
+
+    def add_user(self, content):
+        folded = self._take_folded()
+        if folded:
+            self.summary = self._summarize(folded)
+        self.history.append(HumanMessage(content=content))
+
+    async def aadd_user(self, content):
+        folded = self._take_folded()
+        if folded:
+            self.summary = await self._asummarize(folded)
+        self.history.append(HumanMessage(content=content))
+
+    def prompt(self):
+        system = self.system_prompt
+        if self.summary:
+            system += f"\n\nSummary of the conversation so far:\n{self.summary}"
+        last_human = max(
+            (i for i, m in enumerate(self.history) if isinstance(m, HumanMessage)),
+            default=0,
+        )
+        messages = [SystemMessage(system)]
+        for i, message in enumerate(self.history):
+            if isinstance(message, ToolMessage) and i < last_human:
+                message = stub_tool_message(message)
+            messages.append(message)
+        return messages
+
+    def prompt_tokens(self):
+        return sum(message_tokens(m) for m in self.prompt())
+
+    def _turn_starts(self):
+        return [i for i, m in enumerate(self.history) if isinstance(m, HumanMessage)]
+
+    def _take_folded(self):
+        """Pop the oldest complete turns until the history fits the limits."""
+        folded = []
+        starts = self._turn_starts()
+        while starts and (
+            len(starts) >= self.keep_turns or self.prompt_tokens() > self.max_tokens
+        ):
+            end = starts[1] if len(starts) > 1 else len(self.history)
+            folded.extend(self.history[:end])
+            del self.history[:end]
+            self.folded_turns += 1
+            starts = self._turn_starts()
+        return folded
+
+    def _transcript(self, folded):
+        lines = []
+        for message in folded:
+            if isinstance(message, ToolMessage):
+                message = stub_tool_message(message)
+            if message.content:
+                lines.append(f"{message.type}: {message.content}")
+        return "\n".join(lines)
+
+    def _summary_request(self, folded):
+        return [
+            SystemMessage(SUMMARY_PROMPT.format(words=self.summary_tokens * 3 // 4)),
+            HumanMessage(
+                f"Summary so far:\n{self.summary or '(empty)'}\n\nNew dialogue:\n{self._transcript(folded)}"
+            ),
+        ]
+
+    def _clip(self, text):
+        limit = self.summary_tokens * 4
+        return text if len(text) <= limit else text[-limit:]
+
+    def _summarize(self, folded):
+        if self.summarizer is None:
+            return self._clip(f"{self.summary}\n{self._transcript(folded)}".strip())
+        return self._clip(self.summarizer.invoke(self._summary_request(folded)).content)
+
+    async def _asummarize(self, folded):
+        if self.summarizer is None:
+            return self._summarize(folded)
+        result = await self.summarizer.ainvoke(self._summary_request(folded))
+        return self._clip(result.content)
@@ -0,0 +1,151 @@
+"""
+Speculative search during the confirmation turn.
+
+The system prompts make the model confirm the route and date before it
+calls one_way_flight, so a confirmation naming a complete parameter set is
+the next tool call one user round-trip early. That search is started in
+the background at PREFETCH priority; when the user says yes, the tool
+finds it in the response cache, or joins it if it is still running.
+"""
+
+import os, time, asyncio, threading
+from collections import Counter, OrderedDict
+from skyscanner.cache import cache_key
+from skyscanner.client import CACHE_ENABLED
+from skyscanner.quota import PREFETCH
+from skyscanner.polling import IncrementalSearch
+from skyscanner.aio import get_async_client
+from skyscanner.results import parser
+from assistant.extract import extract_params
+from assistant import telemetry
+
+PREFETCH_ENABLED = os.getenv("PREFETCH", "1") != "0"
+# Below the fast path's threshold: "...or would you like another day?" is normal in a confirmation
+PREFETCH_CONFIDENCE = float(os.getenv("PREFETCH_CONFIDENCE", "0.7"))
+# Unclaimed prefetches tracked at once, the oldest is written off as unused past this
+MAX_PENDING = int(os.getenv("PREFETCH_MAX_PENDING", "8"))
+# A prefetch no tool call has claimed after this long counts as unused
+PREFETCH_TTL = float(os.getenv("PREFETCH_TTL", "600"))
+
+SEARCH_DEFAULTS = {"market": "IN", "locale": "en-GB", "currency": "INR"}
+ROUTE_PARAMS = ("fromEntityId", "toEntityId", "departDate", "wholeMonthDepart")
+
+PREFETCHES = telemetry.Counter(
+    "chat_prefetches_total", "Speculative searches by outcome: started, used, unused, failed"
+)
+
+
+class Prefetcher:
+    """
+    Starts at most one search per distinct parameter set and keeps track of
+    it until a tool call claims it (used), it fails, or it is written off
+    by age or by the MAX_PENDING cap (unused).
+    """
+
+    def __init__(self, confidence=PREFETCH_CONFIDENCE, max_pending=MAX_PENDING, ttl=PREFETCH_TTL):
+        self.confidence = confidence
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.stats = Counter()
+        self._pending = OrderedDict()  # cache key -> start time
+        self._tasks = set()
+        self._lock = threading.Lock()
+
+    def _note(self, outcome):
+        self.stats[outcome] += 1
+        PREFETCHES.inc(outcome=outcome)
+
+    def predict(self, text, today=None):
+        """The search a confirmation message describes, or None."""
+        if not isinstance(text, str):
+            return None
+        params, confidence = extract_params(text, today)
+        if params is None or confidence < self.confidence:
+            return None
+        return dict(SEARCH_DEFAULTS, **{k: params[k] for k in ROUTE_PARAMS if k in params})
+
+    def _admit(self, params):
+        """Start tracking params; False when the same search is already pending."""
+        key = cache_key(params)
+        now = time.monotonic()
+        with self._lock:
+            while self._pending and now - next(iter(self._pending.values())) >= self.ttl:
+                self._pending.popitem(last=False)
+                self._note("unused")
+            if key in self._pending:
+                return False
+            self._pending[key] = now
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+                self._note("unused")
+        self._note("started")
+        return True
+
+    def _failed(self, params):
+        with self._lock:
+            if self._pending.pop(cache_key(params), None) is None:
+                return
+        self._note("failed")
+
+    def claim(self, params):
+        """For the search tools: True when this search was prefetched."""
+        with self._lock:
+            started = self._pending.pop(cache_key(params), None)
+        if started is None:
+            return False
+        self._note("used")
+        return True
+
+    def prefetch(self, text):
+        """Threaded callers: start the predicted search, returning its params or None."""
+        params = self.predict(text)
+        if params is None or not self._admit(params):
+            return None
+
+        def run():
+            search = IncrementalSearch(params, parse=parser(), priority=PREFETCH)
+            search.wait()
+            if search.error is not None:
+                self._failed(params)
+
+        threading.Thread(target=run, daemon=True, name="prefetch").start()
+        return params
+
+    def prefetch_task(self, text):
+        """Event-loop callers: the same as prefetch(), run as a task on the running loop."""
+        params = self.predict(text)
+        if params is None or not self._admit(params):
+            return None
+
+        async def run():
+            try:
+                _, error = await get_async_client().search(params, parse=parser(), priority=PREFETCH)
+            except Exception as e:
+                error = e
+            if error is not None:
+                self._failed(params)
+
+        task = asyncio.get_running_loop().create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return params
+
+
+_prefetcher = None
+_lock = threading.Lock()
+
+
+def get_prefetcher():
+    """The process-wide prefetcher, or None when PREFETCH=0 or there is no response cache to keep results in."""
+    global _prefetcher
+    if _prefetcher is None and PREFETCH_ENABLED and CACHE_ENABLED:
+        with _lock:
+            if _prefetcher is None:
+                _prefetcher = Prefetcher()
+    return _prefetcher
+
+
+def claim(params):
+    """Prefetcher.claim on the shared prefetcher; False when prefetching is off."""
+    prefetcher = get_prefetcher()
+    return prefetcher is not None and prefetcher.claim(params)
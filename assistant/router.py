@@ -0,0 +1,264 @@
+"""
+Latency-aware routing between the cloud model (Gemini) and the local one
+(Ollama), behind a single chat-model interface.
+
+Simple extraction turns go to the local model first, summaries and
+everything else to the cloud model, and a backend failing most of its
+recent calls is tried last. When the first choice has not answered within
+its rolling p95 latency, the request is hedged: the same messages go to
+the next backend too and the first valid reply wins.
+"""
+
+import os, time, asyncio, threading
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from assistant.extract import extract_params
+from assistant.llm_cache import model_id
+from assistant import telemetry
+
+ROUTER_HEDGE = os.getenv("ROUTER_HEDGE", "1") != "0"
+# Calls per backend the latency and error rates are taken over
+ROUTER_WINDOW = int(os.getenv("ROUTER_WINDOW", "100"))
+# Below this many calls a backend's p95 is not trusted, ROUTER_HEDGE_DELAY_MS is used
+ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "5"))
+ROUTER_HEDGE_DELAY_MS = float(os.getenv("ROUTER_HEDGE_DELAY_MS", "1500"))
+ROUTER_MIN_HEDGE_DELAY_MS = float(os.getenv("ROUTER_MIN_HEDGE_DELAY_MS", "50"))
+# A backend failing more than this share of recent calls is only used as the hedge
+ROUTER_MAX_ERROR_RATE = float(os.getenv("ROUTER_MAX_ERROR_RATE", "0.5"))
+# User turns the rule-based extractor reads this confidently, or this short, go to the local model
+ROUTER_SIMPLE_CONFIDENCE = float(os.getenv("ROUTER_SIMPLE_CONFIDENCE", "0.9"))
+ROUTER_SIMPLE_WORDS = int(os.getenv("ROUTER_SIMPLE_WORDS", "4"))
+
+ROUTER_CALLS = telemetry.Counter(
+    "llm_router_calls_total", "Backend calls by backend and outcome: won, lost, invalid, error"
+)
+ROUTER_HEDGES = telemetry.Counter("llm_router_hedges_total", "Requests also sent to a second backend, by first choice")
+BACKEND_SECONDS = telemetry.Histogram("llm_backend_seconds", "Time to a valid reply per backend")
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="router")
+
+
+class BackendStats:
+    """
+    Latencies of the last valid replies and outcomes of the last calls of
+    one backend. A loser of a hedge adds its latency but no outcome: it
+    neither failed nor was the reply used.
+    """
+
+    def __init__(self, window=ROUTER_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True for a winning reply
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, seconds, outcome):
+        with self._lock:
+            if outcome in ("won", "lost"):
+                self.latencies.append(seconds)
+            if outcome != "lost":
+                self.outcomes.append(outcome == "won")
+            self.calls[outcome] += 1
+
+    def p95(self):
+        with self._lock:
+            if len(self.latencies) < ROUTER_MIN_SAMPLES:
+                return None
+            values = sorted(self.latencies)
+        return values[min(int(len(values) * 0.95), len(values) - 1)]
+
+    def error_rate(self):
+        with self._lock:
+            if len(self.outcomes) < ROUTER_MIN_SAMPLES:
+                return 0.0
+            return 1 - sum(self.outcomes) / len(self.outcomes)
+
+
+class RoutedChatModel(BaseChatModel):
+    """
+    Chat model over named backends. bind_tools() binds every backend and
+    returns a router sharing this one's stats. Replies come back whole, so
+    a routed model does not stream token by token.
+    """
+
+    # name -> chat model
+    backends: dict
+    cloud: str = "gemini"
+    local: str = "ollama"
+    hedge: bool = ROUTER_HEDGE
+    # Names of the bound tools, a tool call naming anything else is not a valid reply
+    tool_names: tuple = ()
+    # name -> BackendStats, shared with bound copies
+    stats: dict = {}
+
+    def model_post_init(self, context):
+        super().model_post_init(context)
+        for name in self.backends:
+            self.stats.setdefault(name, BackendStats())
+
+    @property
+    def _llm_type(self):
+        return "router"
+
+    @property
+    def model(self):
+        """Backend ids, so the LLM response cache keys a routed model apart from each backend."""
+        return "+".join(str(model_id(backend)) for backend in self.backends.values())
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(
+            update={
+                "backends": {name: backend.bind_tools(tools, **kwargs) for name, backend in self.backends.items()},
+                "tool_names": tuple(convert_to_openai_tool(t)["function"]["name"] for t in tools),
+            }
+        )
+
+    def _simple(self, message):
+        if not isinstance(message, HumanMessage) or not isinstance(message.content, str):
+            return False
+        if len(message.content.split()) <= ROUTER_SIMPLE_WORDS:
+            return True
+        _, confidence = extract_params(message.content)
+        return confidence >= ROUTER_SIMPLE_CONFIDENCE
+
+    def order(self, messages):
+        """Backend names in the order to try them for these messages."""
+        first = self.local if messages and self._simple(messages[-1]) else self.cloud
+        names = ([first] if first in self.backends else []) + [n for n in self.backends if n != first]
+        # Stable: a failing backend moves behind the healthy ones, the rest keep their order
+        return sorted(names, key=lambda n: self.stats[n].error_rate() > ROUTER_MAX_ERROR_RATE)
+
+    def hedge_delay(self, name):
+        p95 = self.stats[name].p95()
+        delay = ROUTER_HEDGE_DELAY_MS / 1000 if p95 is None else p95
+        return max(delay, ROUTER_MIN_HEDGE_DELAY_MS / 1000)
+
+    def _valid(self, message):
+        if getattr(message, "invalid_tool_calls", None):
+            return False
+        if message.tool_calls:
+            return all(
+                isinstance(call.get("args"), dict) and (not self.tool_names or call["name"] in self.tool_names)
+                for call in message.tool_calls
+            )
+        return bool(message.content)
+
+    def _finished(self, name, start, error, message):
+        """(usable, seconds, outcome) of a finished call."""
+        seconds = time.perf_counter() - start
+        valid = error is None and self._valid(message)
+        outcome = "error" if error is not None else "won" if valid else "invalid"
+        if valid:
+            BACKEND_SECONDS.observe(seconds, backend=name)
+        return valid, seconds, outcome
+
+    def _note(self, name, seconds, outcome):
+        self.stats[name].record(seconds, outcome)
+        ROUTER_CALLS.inc(backend=name, outcome=outcome)
+
+    def _result(self, message, name, hedged):
+        span = telemetry.current_span()
+        if span is not None:
+            span.update({"llm.backend": name, "llm.hedged": hedged})
+        message.response_metadata = {**message.response_metadata, "backend": name, "hedged": hedged}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        order = self.order(messages)
+        pending = {}  # future -> (name, start)
+        first_start = time.perf_counter()
+        hedged = False
+        fallback = error = None
+
+        def launch(name):
+            future = _executor.submit(self.backends[name].invoke, messages, stop=stop, **kwargs)
+            pending[future] = (name, time.perf_counter())
+
+        launch(order.pop(0))
+        primary = next(iter(pending.values()))[0]
+        while pending:
+            timeout = None
+            if order and self.hedge and not hedged:
+                timeout = max(self.hedge_delay(primary) - (time.perf_counter() - first_start), 0)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                ROUTER_HEDGES.inc(primary=primary)
+                launch(order.pop(0))
+                continue
+            for future in done:
+                name, start = pending.pop(future)
+                message = None if future.exception() else future.result()
+                valid, seconds, outcome = self._finished(name, start, future.exception(), message)
+                self._note(name, seconds, outcome)
+                if valid:
+                    for loser, (other, other_start) in pending.items():
+                        # Threads can't be cancelled, the loser still counts toward its backend's stats
+                        loser.add_done_callback(lambda f, n=other, s=other_start: self._lost(n, s, f))
+                    return self._result(message, name, hedged)
+                error = future.exception() or error
+                fallback = fallback or message
+            if not pending and order:
+                # Everything sent so far failed: fall over to the next backend
+                launch(order.pop(0))
+        if fallback is not None:
+            return self._result(fallback, primary, hedged)
+        raise error
+
+    def _lost(self, name, start, future):
+        message = None if future.exception() else future.result()
+        valid, seconds, outcome = self._finished(name, start, future.exception(), message)
+        self._note(name, seconds, "lost" if valid else outcome)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        order = self.order(messages)
+        pending = {}  # task -> (name, start)
+        first_start = time.perf_counter()
+        hedged = False
+        fallback = error = None
+
+        def launch(name):
+            task = asyncio.ensure_future(self.backends[name].ainvoke(messages, stop=stop, **kwargs))
+            pending[task] = (name, time.perf_counter())
+
+        launch(order.pop(0))
+        primary = next(iter(pending.values()))[0]
+        won = False
+        try:
+            while pending:
+                timeout = None
+                if order and self.hedge and not hedged:
+                    timeout = max(self.hedge_delay(primary) - (time.perf_counter() - first_start), 0)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    ROUTER_HEDGES.inc(primary=primary)
+                    launch(order.pop(0))
+                    continue
+                for task in done:
+                    name, start = pending.pop(task)
+                    message = None if task.exception() else task.result()
+                    valid, seconds, outcome = self._finished(name, start, task.exception(), message)
+                    self._note(name, seconds, outcome)
+                    if valid:
+                        won = True
+                        return self._result(message, name, hedged)
+                    error = task.exception() or error
+                    fallback = fallback or message
+                if not pending and order:
+                    # Everything sent so far failed: fall over to the next backend
+                    launch(order.pop(0))
+        finally:
+            for task, (name, start) in pending.items():
+                task.cancel()
+                if won:
+                    # A cancelled loser took at least this long: a lower bound, so an always-slow
+                    # first choice still pushes up its own p95. Nothing is recorded when the caller
+                    # was cancelled or no backend answered, those calls never had their chance
+                    self._note(name, time.perf_counter() - start, "lost")
+        if fallback is not None:
+            return self._result(fallback, primary, hedged)
+        raise error
@@ -0,0 +1,93 @@
+"""
+Stream model replies to the user as they are generated, recording the
+time to first token
+"""
+
+import time
+from langchain_core.messages.utils import message_chunk_to_message
+from assistant.telemetry import record_ttft
+
+
+class ConsolePrinter:
+    """
+    on_token callback that prints a reply after the "|> " prompt as the
+    text arrives; finish() ends the line once the turn is over.
+    """
+
+    def __init__(self, end="\n\n"):
+        self.end = end
+        self.started = False
+
+    def __call__(self, text):
+        if not self.started:
+            text = text.lstrip()
+            if not text:
+                return
+            print("|> ", end="")
+            self.started = True
+        print(text, end="", flush=True)
+
+    def finish(self):
+        if not self.started:
+            print("|> ", end="")
+        print(end=self.end, flush=True)
+
+
+class _FirstToken:
+    def __init__(self, stage):
+        self.stage = stage
+        self.start = time.perf_counter()
+        self.seconds = None
+
+    def seen(self, text):
+        if text and self.seconds is None:
+            self.seconds = time.perf_counter() - self.start
+            record_ttft(self.seconds, self.stage)
+
+
+def _text(chunk):
+    return chunk.content if isinstance(chunk.content, str) else ""
+
+
+def stream_message(chunks, on_token=None, stage=None):
+    """
+    Drain a LangChain `.stream()` iterator, passing each text delta to
+    `on_token`. Returns the merged AIMessage (tool calls included) so it
+    can go into history whole.
+    """
+    first = _FirstToken(stage)
+    merged = None
+    for chunk in chunks:
+        merged = chunk if merged is None else merged + chunk
+        text = _text(chunk)
+        first.seen(text)
+        if text and on_token is not None:
+            on_token(text)
+    return message_chunk_to_message(merged)
+
+
+async def astream_message(chunks, on_token=None, stage=None):
+    """Async counterpart of stream_message for `.astream()` iterators."""
+    first = _FirstToken(stage)
+    merged = None
+    async for chunk in chunks:
+        merged = chunk if merged is None else merged + chunk
+        text = _text(chunk)
+        first.seen(text)
+        if text and on_token is not None:
+            on_token(text)
+    return message_chunk_to_message(merged)
+
+
+def stream_text(deltas, on_token=None, stage=None):
+    """Same for plain text deltas (OpenAI-compatible or completion-style LLMs)."""
+    first = _FirstToken(stage)
+    parts = []
+    for text in deltas:
+        if not text:
+            continue
+        first.seen(text)
+        parts.append(text)
+        if on_token is not None:
+            on_token(text)
+    return "".join(parts)
@@ -0,0 +1,286 @@
+"""
+Per-stage spans and Prometheus-style metrics for the chat pipeline.
+
+Spans nest through a context variable and, when TRACE_PATH is set, are
+appended to it as OTLP/JSON span objects, one per line. Metrics are kept
+in-process and served in the Prometheus text format on METRICS_PORT.
+Both exports are off unless configured.
+"""
+
+import os, json, time, random, weakref, threading, contextvars
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from assistant.tokens import estimate_tokens
+
+TRACE_PATH = os.getenv("TRACE_PATH")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "indigo-flight-bot")
+# Finished spans kept in memory for inspection
+TRACE_BUFFER = int(os.getenv("TRACE_BUFFER", "1024"))
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7)
+
+_current = contextvars.ContextVar("span", default=None)
+_write_lock = threading.Lock()
+RECENT_SPANS = deque(maxlen=TRACE_BUFFER)
+
+
+# ---------------------------- Metrics ----------------------------
+
+
+def _labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in key) + "}"
+
+
+class Counter:
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.values = defaultdict(float)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.values[key] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_labels(key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, buckets=SECONDS_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self.values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            row = self.values.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += 1
+            row[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, row in sorted(self.values.items()):
+                for bound, count in zip(self.buckets, row):
+                    lines.append(f"{self.name}_bucket{_labels(key + (('le', f'{bound:g}'),))} {count}")
+                lines.append(f"{self.name}_bucket{_labels(key + (('le', '+Inf'),))} {row[-2]}")
+                lines.append(f"{self.name}_sum{_labels(key)} {row[-1]:g}")
+                lines.append(f"{self.name}_count{_labels(key)} {row[-2]}")
+        return lines
+
+
+REGISTRY = []
+
+STAGE_SECONDS = Histogram("chat_stage_seconds", "Time spent per pipeline stage")
+STAGE_ERRORS = Counter("chat_stage_errors_total", "Pipeline stages that raised")
+LLM_TOKENS = Counter("chat_llm_tokens_total", "Prompt and completion tokens per LLM stage")
+UPSTREAM_RESPONSES = Counter("skyscanner_responses_total", "RapidAPI responses by status and cache status")
+SEARCHES = Counter("skyscanner_searches_total", "Tool searches, coalesced=yes when they shared another's upstream requests")
+RESPONSE_BYTES = Histogram("skyscanner_response_bytes", "Body bytes read per search", BYTES_BUCKETS)
+TIME_TO_FIRST_TOKEN = Histogram("chat_time_to_first_token_seconds", "Time until a streamed reply shows its first text")
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=METRICS_PORT):
+    """Serve /metrics from a daemon thread; a no-op when no port is configured."""
+    if not port:
+        return None
+    server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ---------------------------- Spans ----------------------------
+
+
+def _any_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_any_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.error = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def update(self, attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def to_otel(self):
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": _any_value(v)} for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+            "resource": {"service.name": SERVICE_NAME},
+        }
+
+
+def current_span():
+    return _current.get()
+
+
+def record_ttft(seconds, stage=None):
+    """Time to first token of a streamed reply, labelled with the current span by default."""
+    s = _current.get()
+    if s is not None:
+        s.set("gen_ai.time_to_first_token", round(seconds, 6))
+    TIME_TO_FIRST_TOKEN.observe(seconds, stage=stage or (s.name if s else "llm"))
+
+
+def _finish(span):
+    STAGE_SECONDS.observe(span.duration, stage=span.name)
+    if span.error:
+        STAGE_ERRORS.inc(stage=span.name)
+    RECENT_SPANS.append(span)
+    if TRACE_PATH:
+        line = json.dumps(span.to_otel())
+        with _write_lock, open(TRACE_PATH, "a") as f:
+            f.write(line + "\n")
+
+
+@contextmanager
+def span(name, attributes=None):
+    """Time a stage as a child of the current span."""
+    s = Span(name, _current.get(), attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = repr(e)
+        raise
+    finally:
+        s.end_ns = time.time_ns()
+        _current.reset(token)
+        _finish(s)
+
+
+# ---------------------------- Stage attributes ----------------------------
+
+
+def _text(content):
+    return content if isinstance(content, str) else json.dumps(content)
+
+
+def record_llm(span, prompt, message):
+    """Token counts for one model call, from usage metadata when the backend reports it."""
+    if message.response_metadata.get("cached"):
+        # Answered by assistant/llm_cache.py, no tokens spent
+        span.set("gen_ai.cached", True)
+        return
+    usage = getattr(message, "usage_metadata", None) or {}
+    prompt_tokens = usage.get("input_tokens") or sum(estimate_tokens(_text(m.content)) for m in prompt)
+    completion = _text(message.content) + (json.dumps(message.tool_calls) if message.tool_calls else "")
+    completion_tokens = usage.get("output_tokens") or estimate_tokens(completion)
+    span.update(
+        {
+            "gen_ai.usage.input_tokens": prompt_tokens,
+            "gen_ai.usage.output_tokens": completion_tokens,
+            "gen_ai.usage.estimated": not usage,
+            "gen_ai.tool_calls": len(message.tool_calls or []),
+        }
+    )
+    LLM_TOKENS.inc(prompt_tokens, stage=span.name, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, stage=span.name, kind="completion")
+
+
+# ResultSets already counted, a coalesced search shares its leader's
+_counted = weakref.WeakSet()
+
+
+def record_search(span, results):
+    """Upstream statuses, cache status, payload size and streamed parse time of a search."""
+    if results is None:
+        return
+    coalesced = results in _counted
+    _counted.add(results)
+    SEARCHES.inc(coalesced="yes" if coalesced else "no")
+    span.set("skyscanner.coalesced", coalesced)
+    statuses = [status for status, _ in results.responses]
+    span.update(
+        {
+            "http.response.status_code": statuses[-1] if statuses else 0,
+            "skyscanner.status_codes": statuses,
+            "skyscanner.polls": max(len(statuses) - 1, 0),
+            "skyscanner.cache_hit": any(cache != "miss" for _, cache in results.responses),
+            "skyscanner.stale": any(cache == "stale" for _, cache in results.responses),
+            "http.response.body.size": results.bytes,
+            "skyscanner.parse_seconds": round(results.parse_seconds, 6),
+            "skyscanner.results": results.seen,
+            "skyscanner.kept": len(results.items),
+        }
+    )
+    if coalesced:
+        return
+    for status, cache in results.responses:
+        UPSTREAM_RESPONSES.inc(status=status, cache=cache)
+    RESPONSE_BYTES.observe(results.bytes)
+    # Decoding and carrier filtering run interleaved with the socket reads
+    STAGE_SECONDS.observe(results.parse_seconds, stage="search.parse")
@@ -0,0 +1,11 @@
+"""
+Cheap prompt-size estimates
+"""
+
+# ~4 characters per token for English/JSON with the Gemini and Llama
+# tokenizers; close enough for budgeting without a tokenizer download
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
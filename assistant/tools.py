@@ -0,0 +1,253 @@
+"""
+Async LangChain tools for the chat engine
+"""
+
+import asyncio
+from langchain_core.tools import StructuredTool, tool
+from skyscanner.aio import get_async_client
+from skyscanner.polling import IncrementalSearch
+from skyscanner.results import parser
+from assistant.compact import compact_results, compact_batch, compact_detail
+from assistant.telemetry import span, record_search
+from assistant.fares import answer
+from skyscanner.fare_calendar import calendar_for
+from skyscanner.batch import batch_search, batch_search_sync, date_range, expand
+from skyscanner.quota import describe
+from skyscanner.places import resolve_code, resolve_params
+from skyscanner.details import get_details
+from assistant.prefetch import claim
+
+
+# Function to query the Skyscanner API without blocking the event loop
+@tool
+async def one_way_flight(
+    fromEntityId: str, toEntityId: str=None, departDate:str=None, wholeMonthDepart:str=None
+) -> str:
+    """
+    Queries the API for one-way flights.
+
+    Parameters:
+    - 'fromEntityId' Required : departure city, airport name or IATA code,
+    - 'toEntityId': arrival city, airport name or IATA code,
+    - 'departDate': 'YYYY-MM-DD',
+    - 'wholeMonthDepart': 'YYYY-MM'(Use this or 'departDate' not Both),
+
+    Returns:
+    str: A string of the flight search results.
+    """
+    querystring = {
+        "fromEntityId": fromEntityId,
+        "toEntityId": toEntityId,
+        "departDate": departDate,
+        "wholeMonthDepart": wholeMonthDepart,
+        "market": "IN",
+        "locale": "en-GB",
+        "currency": "INR",
+    }
+    querystring = resolve_params(querystring)
+    with span("search.http") as stage:
+        stage.set("search.prefetched", claim(querystring))
+        results, error = await get_async_client().search(querystring, parse=parser())
+        record_search(stage, results)
+    if error is not None:
+        return f"Error: {describe(error)}"
+    get_details().remember(results)
+    with span("search.compact") as stage:
+        result, stats = compact_results(results.items, departDate, wholeMonthDepart)
+        stage.update({"compact.rows": stats["rows"], "compact.tokens": stats["compact_tokens"]})
+    return result
+
+
+def _calendar_params(fromEntityId, toEntityId, wholeMonthDepart):
+    querystring = {
+        "fromEntityId": fromEntityId,
+        "toEntityId": toEntityId,
+        "wholeMonthDepart": wholeMonthDepart,
+        "market": "IN",
+        "locale": "en-GB",
+        "currency": "INR",
+    }
+    return resolve_params(querystring)
+
+
+def _calendar_text(calendar, direct_only, max_price):
+    if calendar is None:
+        return "No fares found for that month."
+    return answer(calendar, direct=direct_only, max_price=max_price)
+
+
+def _fare_calendar(
+    fromEntityId: str, toEntityId: str, wholeMonthDepart: str, direct_only: bool=False, max_price: float=None
+) -> str:
+    """
+    Finds the cheapest days to fly in a month, or every day at or under a price.
+    Use it instead of one_way_flight for questions like "cheapest day in July" or "any day under 4000 in July".
+
+    Parameters:
+    - 'fromEntityId' Required : departure city, airport name or IATA code,
+    - 'toEntityId' Required : arrival city, airport name or IATA code,
+    - 'wholeMonthDepart' Required : 'YYYY-MM',
+    - 'direct_only': only count direct flights,
+    - 'max_price': price cap in INR, list every day at or under it,
+
+    Returns:
+    str: A short answer naming the days and fares.
+    """
+    querystring = _calendar_params(fromEntityId, toEntityId, wholeMonthDepart)
+    prefetched = claim(querystring)
+    calendar = calendar_for(querystring)
+    if calendar is None:
+        # The month search fills the calendar as a side effect
+        with span("search.http", {"search.prefetched": prefetched}) as stage:
+            search = IncrementalSearch(querystring, parse=parser())
+            search.wait()
+            record_search(stage, search.results)
+        if search.error is not None:
+            return f"Error: {describe(search.error)}"
+        calendar = calendar_for(querystring)
+    return _calendar_text(calendar, direct_only, max_price)
+
+
+async def _afare_calendar(
+    fromEntityId: str, toEntityId: str, wholeMonthDepart: str, direct_only: bool=False, max_price: float=None
+) -> str:
+    querystring = _calendar_params(fromEntityId, toEntityId, wholeMonthDepart)
+    prefetched = claim(querystring)
+    calendar = calendar_for(querystring)
+    if calendar is None:
+        with span("search.http", {"search.prefetched": prefetched}) as stage:
+            results, error = await get_async_client().search(querystring, parse=parser())
+            record_search(stage, results)
+        if error is not None:
+            return f"Error: {describe(error)}"
+        calendar = calendar_for(querystring)
+    return _calendar_text(calendar, direct_only, max_price)
+
+
+# Whole-month lookups answered from the cached fare calendar
+fare_calendar = StructuredTool.from_function(
+    func=_fare_calendar, coroutine=_afare_calendar, name="fare_calendar"
+)
+
+
+def _batch_params(fromEntityIds, toEntityIds, departDates, departDateFrom, departDateTo):
+    dates = list(departDates or [])
+    if departDateFrom:
+        dates += date_range(departDateFrom, departDateTo or departDateFrom)
+    if not dates:
+        raise ValueError("give departDates or departDateFrom/departDateTo")
+    base = {"market": "IN", "locale": "en-GB", "currency": "INR"}
+    origins = [resolve_code(place) or place for place in fromEntityIds]
+    destinations = [resolve_code(place) or place for place in toEntityIds]
+    return expand(origins, destinations, dates, base)
+
+
+def _batch_text(stage, batch):
+    stage.update({"batch.errors": len(batch.errors), "batch.found": len(batch.items)})
+    for _, results, error in batch.results:
+        if error is None:
+            get_details().remember(results, prefetch=0)
+    if batch.errors and not batch.items:
+        return f"Error: {describe(batch.errors[0][1])}"
+    result, _ = compact_batch(batch)
+    return result
+
+
+def _batch_flights(
+    fromEntityIds: list[str],
+    toEntityIds: list[str],
+    departDates: list[str]=None,
+    departDateFrom: str=None,
+    departDateTo: str=None,
+) -> str:
+    """
+    Searches one-way flights for several routes and/or dates at once and returns one ranked list.
+    Use it instead of calling one_way_flight repeatedly, e.g. "Mumbai to Delhi or Bengaluru, any day this week".
+
+    Parameters:
+    - 'fromEntityIds' Required : list of departure cities, airport names or IATA codes,
+    - 'toEntityIds' Required : list of arrival cities, airport names or IATA codes,
+    - 'departDates': list of 'YYYY-MM-DD',
+    - 'departDateFrom', 'departDateTo': 'YYYY-MM-DD', an inclusive range of dates (instead of or as well as departDates),
+
+    Returns:
+    str: A string of the combined flight search results.
+    """
+    try:
+        searches = _batch_params(fromEntityIds, toEntityIds, departDates, departDateFrom, departDateTo)
+    except ValueError as e:
+        return f"Error: {e}"
+    with span("search.batch", {"batch.searches": len(searches)}) as stage:
+        return _batch_text(stage, batch_search_sync(searches, parse=parser()))
+
+
+async def _abatch_flights(
+    fromEntityIds: list[str],
+    toEntityIds: list[str],
+    departDates: list[str]=None,
+    departDateFrom: str=None,
+    departDateTo: str=None,
+) -> str:
+    try:
+        searches = _batch_params(fromEntityIds, toEntityIds, departDates, departDateFrom, departDateTo)
+    except ValueError as e:
+        return f"Error: {e}"
+    with span("search.batch", {"batch.searches": len(searches)}) as stage:
+        return _batch_text(stage, await batch_search(searches, parse=parser()))
+
+
+# Sync for the threaded LangChain scripts, async for the chat engine
+batch_flights = StructuredTool.from_function(
+    func=_batch_flights, coroutine=_abatch_flights, name="batch_flights"
+)
+
+
+def _detail_ref(flightNumber, departDate):
+    ref = get_details().find(flightNumber, departDate)
+    if ref is None:
+        raise LookupError(f"flight {flightNumber} is not in the recent search results, search for it first")
+    return ref
+
+
+def _flight_details(flightNumber: str, departDate: str=None) -> str:
+    """
+    Details of a flight from the search results already shown: segments, layovers, booking-site fares and notes.
+    Use it for follow-up questions about one of those flights instead of searching again.
+
+    Parameters:
+    - 'flightNumber' Required : the flight number as shown in the results, e.g. '651' or '6E 651',
+    - 'departDate': 'YYYY-MM-DD', only needed when the same flight was shown for several dates,
+
+    Returns:
+    str: A short description of the flight.
+    """
+    try:
+        ref = _detail_ref(flightNumber, departDate)
+        with span("search.detail", {"detail.cached": get_details().cached(ref[1]) is not None}):
+            detail = get_details().fetch(*ref).result()
+    except Exception as e:
+        return f"Error: {describe(e)}"
+    return compact_detail(detail)
+
+
+async def _aflight_details(flightNumber: str, departDate: str=None) -> str:
+    try:
+        ref = _detail_ref(flightNumber, departDate)
+        with span("search.detail", {"detail.cached": get_details().cached(ref[1]) is not None}):
+            detail = await asyncio.wrap_future(get_details().fetch(*ref))
+    except Exception as e:
+        return f"Error: {describe(e)}"
+    return compact_detail(detail)
+
+
+flight_details = StructuredTool.from_function(
+    func=_flight_details, coroutine=_aflight_details, name="flight_details"
+)
+
+
+TOOLS = {
+    "one_way_flight": one_way_flight,
+    "fare_calendar": fare_calendar,
+    "batch_flights": batch_flights,
+    "flight_details": flight_details,
+}
@@ -0,0 +1,145 @@
+"""
+Fast startup: model clients (and the provider packages behind them, the
+slow part of a cold start) are built in the background while the greeting
+is shown, Ollama is pinged so its model is loaded before the first turn,
+and the time each phase took is kept for a startup report.
+
+Entry points import this module first, so "imports" is measured from here.
+"""
+
+import os, time, asyncio, threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+import requests
+from assistant import telemetry
+
+STARTED = time.perf_counter()
+
+# 0 builds model clients in the foreground before the prompt is shown
+BACKGROUND_WARMUP = os.getenv("BACKGROUND_WARMUP", "1") != "0"
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+# How long Ollama keeps the model in memory after the warm-up ping and each request
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_WARMUP_TIMEOUT = float(os.getenv("OLLAMA_WARMUP_TIMEOUT", "120"))
+# Set to print the startup breakdown after the first turn
+STARTUP_REPORT = os.getenv("STARTUP_REPORT", "0") != "0"
+
+STARTUP_SECONDS = telemetry.Histogram(
+    "process_startup_seconds", "Startup phases: imports, ready, model, warmup, model_wait, first_turn"
+)
+
+
+class Startup:
+    """Seconds per startup phase, in the order they finished."""
+
+    def __init__(self, started=STARTED):
+        self.started = started
+        self.phases = {}
+        self.background = set()
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, background=False):
+        with self._lock:
+            if name in self.phases:
+                return False
+            self.phases[name] = seconds
+            if background:
+                self.background.add(name)
+        STARTUP_SECONDS.observe(seconds, phase=name)
+        return True
+
+    def since_start(self, name):
+        """Record the time from process start to now, e.g. "imports" or "ready"."""
+        return self.record(name, time.perf_counter() - self.started)
+
+    @contextmanager
+    def phase(self, name, background=False):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, background)
+
+    def first_turn(self, seconds):
+        """True the first time, so the caller can report the breakdown once."""
+        return self.record("first_turn", seconds)
+
+    def summary(self):
+        with self._lock:
+            return ", ".join(
+                f"{name} {seconds:.2f}s" + (" (background)" if name in self.background else "")
+                for name, seconds in self.phases.items()
+            )
+
+
+startup = Startup()
+
+
+def warm_ollama(model, base_url=None, keep_alive=OLLAMA_KEEP_ALIVE, timeout=OLLAMA_WARMUP_TIMEOUT):
+    """
+    Ask Ollama to load `model` and keep it loaded: a generate request with
+    no prompt only loads. False when Ollama is not reachable.
+    """
+    try:
+        response = requests.post(
+            f"{(base_url or OLLAMA_HOST).rstrip('/')}/api/generate",
+            json={"model": model, "keep_alive": keep_alive},
+            timeout=timeout,
+        )
+        return response.status_code == 200
+    except requests.RequestException:
+        return False
+
+
+class Preload:
+    """
+    A value built once by factory(): in a background thread after start(),
+    or inline by the first get() when nothing started it. get() waits for
+    a build already running, the wait is recorded as "model_wait".
+    """
+
+    def __init__(self, factory, name="model", warm=None):
+        self.factory = factory
+        self.name = name
+        self.warm = warm
+        self._future = None
+        self._lock = threading.Lock()
+
+    def _build(self, background):
+        with startup.phase(self.name, background):
+            value = self.factory()
+        if self.warm is not None:
+            with startup.phase("warmup", background):
+                self.warm(value)
+        return value
+
+    def start(self, background=BACKGROUND_WARMUP):
+        with self._lock:
+            if self._future is not None:
+                return self._future
+            self._future = Future()
+        if not background:
+            self._run(False)
+        else:
+            threading.Thread(target=self._run, args=(True,), daemon=True, name=f"preload-{self.name}").start()
+        return self._future
+
+    def _run(self, background):
+        try:
+            self._future.set_result(self._build(background))
+        except BaseException as e:
+            self._future.set_exception(e)
+
+    def get(self):
+        future = self.start(background=False)
+        if future.done():
+            return future.result()
+        with startup.phase("model_wait"):
+            return future.result()
+
+    async def aget(self):
+        future = self.start()
+        if future.done():
+            return future.result()
+        with startup.phase("model_wait"):
+            return await asyncio.wrap_future(future)
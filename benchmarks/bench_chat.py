@@ -0,0 +1,139 @@
+"""
+Scripted multi-turn load generator for the chat engine.
+
+Replays the conversations in benchmarks/conversations.jsonl across N
+concurrent sessions of assistant.engine.ChatEngine, with a deterministic
+fake model (benchmarks/fake_llm.py) and the RapidAPI replayer standing in
+for Gemini/Ollama and Skyscanner. Reports where the turn time goes:
+memory, extraction, search, summarization and total.
+
+    python benchmarks/bench_chat.py --sessions 50 --think-ms 400 --latency-ms 150
+"""
+
+import sys, os, json, time, asyncio, argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from bench_search import configure, percentile
+
+STAGES = ("memory", "extraction", "search", "summarization", "total")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--conversations", default=os.path.join(ROOT, "benchmarks", "conversations.jsonl"))
+    p.add_argument("--sessions", type=int, default=20)
+    p.add_argument("--think-ms", type=float, default=300)
+    p.add_argument("--llm-concurrency", type=int, default=None)
+    p.add_argument("--tail-rate", type=float, default=0.0, help="share of model calls that take 10x --think-ms")
+    p.add_argument("--router", action="store_true", help="route between a cloud and a local fake model with hedging")
+    p.add_argument("--local-think-ms", type=float, default=None, help="local model latency with --router, default half of --think-ms")
+    p.add_argument("--latency-ms", type=float, default=100)
+    p.add_argument("--jitter-ms", type=float, default=30)
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--incomplete-polls", type=int, default=1)
+    p.add_argument("--poll-interval", type=float, default=0.05)
+    p.add_argument("--cache", action="store_true", help="keep the response cache on")
+    p.add_argument("--rate-limit", type=float, default=0, help="client-side requests/second, 0 leaves the limiter off")
+    p.add_argument("--json", help="also write the results to this file")
+    return p.parse_args()
+
+
+def load_conversations(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def run_session(engine, session_id, conversation, samples):
+    session = engine.session(session_id)
+    for turn in conversation["turns"]:
+        await session.turn(turn["user"])
+        samples.append(session.last_timings)
+    engine.end(session_id)
+
+
+async def run(args, conversations):
+    from assistant.engine import ChatEngine
+    from fake_llm import ScriptedChatModel
+
+    script = {
+        turn["user"]: turn["tool_call"]
+        for conversation in conversations
+        for turn in conversation["turns"]
+        if "tool_call" in turn
+    }
+    replies = {
+        turn["user"]: turn["reply"]
+        for conversation in conversations
+        for turn in conversation["turns"]
+        if "reply" in turn
+    }
+    llm = ScriptedChatModel(script=script, replies=replies, think_ms=args.think_ms, tail_rate=args.tail_rate)
+    if args.router:
+        from assistant.router import RoutedChatModel
+
+        local_ms = args.think_ms / 2 if args.local_think_ms is None else args.local_think_ms
+        local = ScriptedChatModel(script=script, replies=replies, think_ms=local_ms, tail_rate=args.tail_rate)
+        llm = RoutedChatModel(backends={"gemini": llm, "ollama": local})
+    engine = ChatEngine("router" if args.router else "gemini", llm=llm, max_concurrency=args.llm_concurrency)
+    samples = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[
+            run_session(engine, f"load-{i}", conversations[i % len(conversations)], samples)
+            for i in range(args.sessions)
+        ]
+    )
+    return samples, time.perf_counter() - start, engine
+
+
+def summarize(samples, wall):
+    report = {"turns": len(samples), "wall_s": round(wall, 2), "turns_per_s": round(len(samples) / wall, 2)}
+    total = sum(s["total"] for s in samples)
+    for stage in STAGES:
+        values = [s[stage] * 1000 for s in samples if stage in s]
+        if not values:
+            continue
+        report[stage] = {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 50), 1),
+            "p95_ms": round(percentile(values, 95), 1),
+            "p99_ms": round(percentile(values, 99), 1),
+            "mean_ms": round(sum(values) / len(values), 1),
+            "share": round(sum(values) / 1000 / total, 3) if total else 0,
+        }
+    return report
+
+
+def main():
+    args = parse_args()
+    configure(args)
+    conversations = load_conversations(args.conversations)
+    samples, wall, engine = asyncio.run(run(args, conversations))
+    report = summarize(samples, wall)
+
+    print(f"{report['turns']} turns over {args.sessions} sessions in {report['wall_s']}s ({report['turns_per_s']} turns/s)\n")
+    print("stage".ljust(16) + "".join(c.rjust(10) for c in ("count", "p50_ms", "p95_ms", "p99_ms", "mean_ms", "share")))
+    for stage in STAGES:
+        if stage in report:
+            row = report[stage]
+            print(stage.ljust(16) + "".join(str(v).rjust(10) for v in row.values()))
+    from assistant.prefetch import get_prefetcher
+    from assistant.llm_cache import get_llm_cache
+
+    if get_prefetcher() is not None:
+        report["prefetch"] = dict(get_prefetcher().stats)
+        print(f"\nprefetch: {report['prefetch']}")
+    if get_llm_cache() is not None:
+        report["llm_cache"] = dict(get_llm_cache().stats)
+        print(f"llm cache: {report['llm_cache']}")
+    if args.router:
+        report["router"] = {name: dict(stats.calls) for name, stats in engine.llm.stats.items()}
+        print(f"router: {report['router']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Offline end-to-end latency benchmark for the flight search path.
+
+Drives the LangChain one_way_flight tool and/or the legacy query() through
+the RapidAPI replayer (skyscanner/replay.py) and reports p50/p95/p99
+latency, throughput and per-call allocations.
+
+    python benchmarks/bench_search.py --target all --requests 200 --concurrency 8 \
+        --latency-ms 150 --jitter-ms 50 --incomplete-polls 2
+"""
+
+import sys, os, io, time, json, argparse, tracemalloc, contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+# (from, to, departDate, wholeMonthDepart)
+WORKLOAD = [
+    ("BOM", "DEL", "2024-07-17", None),
+    ("BOM", "BLR", "2024-07-19", None),
+    ("DEL", "BOM", "2024-07-18", None),
+    ("HYD", "DEL", None, "2025-05"),
+    ("BLR", "MAA", "2024-07-20", None),
+    ("BOM", "PNQ", None, "2025-05"),
+]
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--target", choices=("tool", "query", "all"), default="all")
+    p.add_argument("--tool-module", default="langchain_system.chat")
+    p.add_argument("--requests", type=int, default=100)
+    p.add_argument("--concurrency", type=int, default=4)
+    p.add_argument("--warmup", type=int, default=5)
+    p.add_argument("--alloc-samples", type=int, default=20)
+    p.add_argument("--latency-ms", type=float, default=100)
+    p.add_argument("--jitter-ms", type=float, default=30)
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--incomplete-polls", type=int, default=1)
+    p.add_argument("--poll-interval", type=float, default=0.05)
+    p.add_argument("--cache", action="store_true", help="keep the response cache on")
+    p.add_argument("--rate-limit", type=float, default=0, help="client-side requests/second, 0 leaves the limiter off")
+    p.add_argument("--json", help="also write the results to this file")
+    return p.parse_args()
+
+
+def configure(args):
+    """Must run before anything under skyscanner/ is imported."""
+    os.environ["SKY_SCANNER_REPLAY"] = "1"
+    os.environ["SKY_SCANNER_CACHE"] = "1" if args.cache else "0"
+    os.environ["SKY_SCANNER_POLL_INTERVAL"] = str(args.poll_interval)
+    os.environ["REPLAY_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["REPLAY_JITTER_MS"] = str(args.jitter_ms)
+    os.environ["REPLAY_ERROR_RATE"] = str(args.error_rate)
+    os.environ["REPLAY_INCOMPLETE_POLLS"] = str(args.incomplete_polls)
+    os.environ["SKY_SCANNER_RATE_LIMIT"] = str(args.rate_limit)
+
+
+def targets(args):
+    found = {}
+    if args.target in ("tool", "all"):
+        module = __import__(args.tool_module, fromlist=["one_way_flight"])
+        tool = module.one_way_flight
+
+        def call_tool(fromEntityId, toEntityId, departDate, wholeMonthDepart):
+            args = {"fromEntityId": fromEntityId, "toEntityId": toEntityId}
+            if departDate:
+                args["departDate"] = departDate
+            if wholeMonthDepart:
+                args["wholeMonthDepart"] = wholeMonthDepart
+            return tool.invoke(args)
+
+        found["one_way_flight"] = call_tool
+    if args.target in ("query", "all"):
+        from chat_with_function_calling_openai import query
+
+        def call_query(fromEntityId, toEntityId, departDate, wholeMonthDepart):
+            return query(fromEntityId, toEntityId, departDate, wholeMonthDepart, locale="", currency="INR")
+
+        found["query"] = call_query
+    return found
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def timed(fn, params):
+    start = time.perf_counter()
+    try:
+        out = fn(*params)
+        failed = str(out).startswith("Error")
+    except Exception:
+        failed = True
+    return time.perf_counter() - start, failed
+
+
+def bench(fn, args):
+    workload = [WORKLOAD[i % len(WORKLOAD)] for i in range(args.requests)]
+    for params in WORKLOAD[: args.warmup]:
+        timed(fn, params)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        results = list(pool.map(lambda params: timed(fn, params), workload))
+    wall = time.perf_counter() - start
+    latencies = [t * 1000 for t, _ in results]
+
+    # Allocations measured separately, tracemalloc would skew the timings
+    peaks, blocks = [], []
+    tracemalloc.start()
+    for params in workload[: args.alloc_samples]:
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        before = sum(s.count for s in tracemalloc.take_snapshot().statistics("filename"))
+        fn(*params)
+        peaks.append((tracemalloc.get_traced_memory()[1] - base) / 1024)
+        after = sum(s.count for s in tracemalloc.take_snapshot().statistics("filename"))
+        blocks.append(after - before)
+    tracemalloc.stop()
+
+    return {
+        "requests": len(results),
+        "errors": sum(failed for _, failed in results),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "throughput_rps": round(len(results) / wall, 2),
+        "peak_alloc_kib": round(max(peaks), 1) if peaks else 0,
+        "mean_peak_alloc_kib": round(sum(peaks) / len(peaks), 1) if peaks else 0,
+        "retained_blocks_per_call": round(sum(blocks) / len(blocks), 1) if blocks else 0,
+    }
+
+
+def main():
+    args = parse_args()
+    configure(args)
+    found = targets(args)
+
+    report = {"config": vars(args), "results": {}}
+    for name, fn in found.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            report["results"][name] = bench(fn, args)
+
+    columns = list(next(iter(report["results"].values())).keys())
+    print("target".ljust(16) + "".join(c.rjust(16) for c in columns[:7]))
+    for name, result in report["results"].items():
+        print(name.ljust(16) + "".join(str(result[c]).rjust(16) for c in columns[:7]))
+    print()
+    for name, result in report["results"].items():
+        print(
+            f"{name}: peak alloc {result['peak_alloc_kib']} KiB "
+            f"(mean {result['mean_peak_alloc_kib']} KiB), "
+            f"{result['retained_blocks_per_call']} blocks retained per call"
+        )
+    from skyscanner.coalesce import COUNTS
+
+    report["coalesce"] = dict(COUNTS)
+    print(f"single-flight: {COUNTS['leaders']} upstream searches, {COUNTS['coalesced']} coalesced")
+    from skyscanner.quota import get_limiter
+
+    if get_limiter() is not None:
+        report["limiter"] = dict(get_limiter().stats)
+        print(f"rate limiter: {report['limiter']}")
+    if args.json:
+        with open(os.path.join(ROOT, args.json) if not os.path.isabs(args.json) else args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Deterministic stand-in for Gemini/Ollama, for load tests that should not
+touch a real model. Users' turns found in the script get their canned tool
+call, those found in `replies` their canned text (e.g. a confirmation
+question), anything else a generic text reply.
+"""
+
+import time, random, asyncio, itertools
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+_call_ids = itertools.count(1)
+
+
+class ScriptedChatModel(BaseChatModel):
+    # user text -> one_way_flight arguments
+    script: dict = {}
+    # user text -> text reply
+    replies: dict = {}
+    # Simulated model latency per call
+    think_ms: float = 0.0
+    # Share of calls that take 10x think_ms, the tail a hedged request cuts
+    tail_rate: float = 0.0
+    # Replies are scripted either way, this is what the LLM response cache sees
+    temperature: float = None
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _reply(self, messages):
+        last = messages[-1]
+        if isinstance(last, ToolMessage):
+            # Compact tables are pipe-separated, the first such line names the columns
+            rows = [line for line in last.content.splitlines() if "|" in line][1:]
+            return AIMessage(content="Here is what I found:\n" + "\n".join(rows[:4]))
+        if isinstance(last, HumanMessage) and last.content in self.script:
+            return AIMessage(
+                content="",
+                tool_calls=[
+                    {
+                        "name": "one_way_flight",
+                        "args": self.script[last.content],
+                        "id": f"call_{next(_call_ids)}",
+                    }
+                ],
+            )
+        if isinstance(last, HumanMessage) and last.content in self.replies:
+            return AIMessage(content=self.replies[last.content])
+        return AIMessage(content="Happy to help with that.")
+
+    def _think_s(self):
+        slow = self.tail_rate and random.random() < self.tail_rate
+        return self.think_ms * (10 if slow else 1) / 1000
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self._think_s())
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self._think_s())
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
@@ -1,8 +1,15 @@
-import sys, json, os
-import http.client
+import sys, json, os, time
+from assistant.warmup import startup, Preload, warm_ollama, OLLAMA_KEEP_ALIVE
+from skyscanner.polling import IncrementalSearch
+from assistant.extract import fast_path
+from skyscanner.results import parser
+from skyscanner.quota import describe
+from skyscanner.places import resolve_params
+from assistant.compact import compact_results
+from assistant.streaming import ConsolePrinter, stream_text
+from assistant.fares import fare_answer
+from assistant.llm_cache import cache_model, cached_call, cached_stream
 from dotenv import load_dotenv
-from langchain_community.llms.ollama import OllamaLLM
-from langchain_core.messages import HumanMessage, SystemMessage
 
 load_dotenv()
 
@@ -26,13 +33,11 @@ tools = [{
             "properties": {
                 "fromEntityId": {
                     "type": "string",
-                    "enum": ["BOM", "DEL", "PNQ", "BLR", "MAA"],
-                    "description": "Airport code for departure city"
+                    "description": "Departure city or airport code"
                 },
                 "toEntityId": {
                     "type": "string",
-                    "enum": ["BOM", "DEL", "PNQ", "BLR", "MAA"],
-                    "description": "Airport code for arrival city"
+                    "description": "Arrival city or airport code"
                 },
                 "departDate": {
                     "type": "string",
@@ -50,19 +55,32 @@ tools = [{
     }
 }]
 
+MODEL = "llama3.2:3b"
+TEMPERATURE = 0
+
 # Initialize Ollama with proper configuration
-llm = OllamaLLM(
-    model="llama3.2:3b",
-    temperature=0,
-    repeat_penalty=1.03, format="json", stop=["</tool_calls>", "</invoke>"],
-)
+def make_llm():
+    # Imported here, the provider package is most of a cold start
+    from langchain_ollama import OllamaLLM
+
+    return OllamaLLM(
+        model=MODEL,
+        temperature=TEMPERATURE,
+        repeat_penalty=1.03, format="json", stop=["</tool_calls>", "</invoke>"],
+        keep_alive=OLLAMA_KEEP_ALIVE,
+    )
+
+# Built, and the model loaded into Ollama, while the user types the first message
+llm = Preload(make_llm, warm=lambda llm: warm_ollama(llm.model, llm.base_url))
 
+# temperature=0, so repeated prompts are answered from the LLM response cache
 def get_completion(messages):
     prompt = "\n".join([f"{m['role']}: {m['content']}" for m in messages])
-    response = llm.invoke(
-        prompt,
-    )
-    return response
+    return cached_call(cache_model(MODEL, TEMPERATURE), messages, lambda: llm.get().invoke(prompt), "extraction")
+
+def stream_completion(messages):
+    prompt = "\n".join([f"{m['role']}: {m['content']}" for m in messages])
+    return cached_stream(cache_model(MODEL, TEMPERATURE), messages, lambda: llm.get().stream(prompt), "summarization")
 
 # Function to print the introductory message and read user's input
 def intro():
@@ -82,58 +100,68 @@ def query(
     locale=None,
     currency=None,
 ):
-    conn = http.client.HTTPSConnection("sky-scanner3.p.rapidapi.com")
-    headers = {
-        "x-rapidapi-key": f"{os.getenv('SKY_SCANNER_API_KEY')}",
-        "x-rapidapi-host": "sky-scanner3.p.rapidapi.com",
-    }
-    req = "/flights/search-one-way?"
     d = {
         "fromEntityId": fromEntityId,
         "toEntityId": toEntityId, "departDate": departDate,
         "wholeMonthDepart": wholeMonthDepart, "market": market,
         "locale": locale, "currency": currency,
     }
-    for i in d:
-        if d[i] is not None:
-            req += i + "=" + str(d[i]) + "&"
-    req = req[:-1]
-    conn.request("GET", req, headers=headers)
-    res = conn.getresponse()
-    data = res.read()
-    return data.decode("utf-8")
+    # Poll incomplete sessions so the summary sees the full result set
+    search = IncrementalSearch(d, parse=parser(carrier=None))
+    search.wait()
+    if search.error is not None:
+        return describe(search.error)
+    result, stats = compact_results(search.items, departDate, wholeMonthDepart)
+    log("COMPACT", stats)
+    return result
 
 # Main chat function
 def chat():
     task = intro()
-    # Use tool calling to extract parameters
-    messages = [
-        {"role": "system", "content": "You are a helpful travel planning assistant. Use the search_flights function to help users find flights. Always respond with a tool call."},
-        {"role": "user", "content": task}
-    ]
-
-    response = get_completion(messages)
-
-    log("MODEL_OUT", response) # response = { "search_flights": "mumbai,IN,DEL,IN,27-Nov-2024" }
-
-    try:
-        tool_call = response
-        if "search_flights" in tool_call:
-            params = tool_call["search_flights"]
-            params_dict = dict([param.split(",") for param in params.split(",")])
-        tool_calls = response_dict.get('tool_calls', [])
-
-        if tool_calls and tool_calls[0]['function']['name'] == 'search_flights':
-            params_dict = json.loads(tool_calls[0]['function']['arguments'])
-            params_dict.update({"locale": "", "currency": "INR"})
-            log("FUNCTION_CALL", params_dict)
-        else:
-            raise ValueError("No valid tool call found")
-    except Exception as e:
-        print("|> Sorry, I couldn't understand your request. Please provide more details.")
-        log("ERROR", str(e))
+    start = time.perf_counter()
+    # Rule-based fast path first, only queries the rules can't place go to the LLM
+    params_dict = fast_path(task)
+    if params_dict is not None:
+        log("FAST_PATH", params_dict)
+    else:
+        # Use tool calling to extract parameters
+        messages = [
+            {"role": "system", "content": "You are a helpful travel planning assistant. Use the search_flights function to help users find flights. Always respond with a tool call."},
+            {"role": "user", "content": task}
+        ]
+
+        response = get_completion(messages)
+
+        log("MODEL_OUT", response) # response = { "search_flights": "mumbai,IN,DEL,IN,27-Nov-2024" }
+
+        try:
+            tool_call = response
+            if "search_flights" in tool_call:
+                params = tool_call["search_flights"]
+                params_dict = dict([param.split(",") for param in params.split(",")])
+            tool_calls = response_dict.get('tool_calls', [])
+
+            if tool_calls and tool_calls[0]['function']['name'] == 'search_flights':
+                params_dict = json.loads(tool_calls[0]['function']['arguments'])
+                params_dict.update({"locale": "", "currency": "INR"})
+                log("FUNCTION_CALL", params_dict)
+            else:
+                raise ValueError("No valid tool call found")
+        except Exception as e:
+            print("|> Sorry, I couldn't understand your request. Please provide more details.")
+            log("ERROR", str(e))
+            return
+
+    # The model may answer with city names, the API wants codes
+    params_dict = resolve_params(params_dict)
+
+    # Cheapest-day and price-cap questions about a month are a calendar lookup
+    fares = fare_answer(params_dict, task, lambda params: query(**params))
+    if fares is not None:
+        log("FARE_CALENDAR", params_dict)
+        print("|> " + fares)
         return
-# Call the Skyscanner API with extracted parameters
+
     # Call the Skyscanner API with extracted parameters
     result = query(**params_dict)
     log("API_OUT", result[:800])
@@ -141,20 +169,24 @@ def chat():
     # Summarize the JSON output
     summary_messages = [
         {"role": "system", "content": "You are a helpful travel planning assistant."},
-        {"role": "user", "content": f"Summarize the following JSON output and present the flights to the user in a conversational format in 3 to 4 lines: \n{result}"}
+        {"role": "user", "content": f"Summarize the following flights table and present the flights to the user in a conversational format in 3 to 4 lines: \n{result}"}
     ]
 
-    summary_response = get_completion(summary_messages)
-    summary = summary_response.choices[0].message.content.strip()
-
-    # Print the summarized output
-    print("|> ", end="")
-    print(summary)
+    # Print the summary as it is generated
+    printer = ConsolePrinter(end="\n")
+    summary = stream_text(stream_completion(summary_messages), printer, stage="summarization")
+    printer.finish()
+    log("SUMMARY", summary)
+    if startup.first_turn(time.perf_counter() - start):
+        log("STARTUP", startup.summary())
 
 if __name__ == "__main__":
+    startup.since_start("imports")
     os.system("cls")
+    llm.start()
     print("|> ", end="")
     print("Hello. I am a travel planning assistant. How can I help you today?")
+    startup.since_start("ready")
 
     while True:
         chat()
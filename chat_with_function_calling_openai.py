@@ -1,6 +1,14 @@
-import sys, json, os
-import http.client
-from openai import OpenAI
+import sys, json, os, time
+from assistant.warmup import startup, Preload
+from skyscanner.polling import IncrementalSearch
+from assistant.extract import fast_path
+from skyscanner.results import parser
+from skyscanner.quota import describe
+from skyscanner.places import resolve_params
+from assistant.compact import compact_results
+from assistant.streaming import ConsolePrinter, stream_text
+from assistant.fares import fare_answer
+from assistant.llm_cache import cache_model, cached_call, cached_stream
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -33,12 +41,6 @@ def query(
     locale=None,
     currency=None,
 ):
-    conn = http.client.HTTPSConnection("sky-scanner3.p.rapidapi.com")
-    headers = {
-        "x-rapidapi-key": f"{os.getenv('SKY_SCANNER_API_KEY')}",
-        "x-rapidapi-host": "sky-scanner3.p.rapidapi.com",
-    }
-    req = "/flights/search-one-way?"
     d = {
         "fromEntityId": fromEntityId,
         "toEntityId": toEntityId,
@@ -48,30 +50,42 @@ def query(
         "locale": locale,
         "currency": currency,
     }
-    for i in d:
-        if d[i] is not None:
-            req += i + "=" + str(d[i]) + "&"
-    req = req[:-1]
-    conn.request("GET", req, headers=headers)
-    res = conn.getresponse()
-    data = res.read()
-    return data.decode("utf-8")
+    # Poll incomplete sessions so the summary sees the full result set
+    search = IncrementalSearch(d, parse=parser(carrier=None))
+    search.wait()
+    if search.error is not None:
+        return describe(search.error)
+    result, stats = compact_results(search.items, departDate, wholeMonthDepart)
+    log("COMPACT", stats)
+    return result
 
 
-# Main chat function
-def chat():
-    task = intro()
+def make_client():
+    # Imported here, the SDK is a good part of a cold start
+    from openai import OpenAI
 
-    client = OpenAI(
+    return OpenAI(
         # api_key=f"{os.getenv('OPENAI_API_KEY')}"  # Replace with your OpenAI API key
         api_key=f"{os.getenv('GEMINI_API_KEY')}",  # Replace with your Gemini API key
         base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
     )
 
-    response = client.chat.completions.create(
-        # model="gpt-4-turbo",
-        model="gemini-2.0-flash",
-        messages=[
+
+# One client for the whole session, built in the background while the user types
+openai_client = Preload(make_client)
+
+
+# Main chat function
+def chat():
+    task = intro()
+    start = time.perf_counter()
+
+    # Rule-based fast path first, only queries the rules can't place go to the LLM
+    params_dict = fast_path(task)
+    if params_dict is not None:
+        log("FAST_PATH", params_dict)
+    else:
+        messages = [
             {
                 "role": "system",
                 "content": "You are a helpful travel planning assistant.",
@@ -79,57 +93,91 @@ def chat():
             {
                 "role": "user",
                 "content": """Extract travel query parameters from the following input in this json format
-                {'fromEntityId': 'BOM'(mumbai) | 'DEL'(delhi) | 'PNQ'(pune) | 'BLR'(bengaluru) | 'MAA'(chennai), 'toEntityId': 'BOM'(mumbai) | 'DEL'(delhi) | 'PNQ'(pune) | 'BLR'(bengaluru) | 'MAA'(chennai), 'departDate': 'YYYY-MM-DD', 'wholeMonthDepart': 'YYYY-MM' #if departDate is absent, 'locale': '', 'currency': 'INR'}:
+                {'fromEntityId': city or airport code, 'toEntityId': city or airport code, 'departDate': 'YYYY-MM-DD', 'wholeMonthDepart': 'YYYY-MM' #if departDate is absent, 'locale': '', 'currency': 'INR'}:
                 """
                 + str(task),
             },
-        ],
-        response_format={"type": "json_object"},
-        max_tokens=100,
-    )
-
-    params = response.choices[0].message.content.strip()
-
-    # Assuming the response text is a valid dictionary string, use eval (or safer parsing)
-    try:
-        params_dict = json.loads(params)
-        log("JSON_IN", params_dict)
-    except:
-        print("|> ", end="")
-        print("Sorry, I couldn't understand your request. Please provide more details.")
+        ]
+        # Deterministic, so a repeated phrasing is answered from the LLM response cache
+        params = cached_call(
+            cache_model("gemini-2.0-flash", temperature=0),
+            messages,
+            # Only turns that reach the model wait for the background client build
+            lambda: openai_client.get().chat.completions.create(
+                # model="gpt-4-turbo",
+                model="gemini-2.0-flash",
+                messages=messages,
+                response_format={"type": "json_object"},
+                max_tokens=100,
+                temperature=0,
+            ).choices[0].message.content.strip(),
+            "extraction",
+        )
+
+        # Assuming the response text is a valid dictionary string, use eval (or safer parsing)
+        try:
+            params_dict = json.loads(params)
+            log("JSON_IN", params_dict)
+        except:
+            print("|> ", end="")
+            print("Sorry, I couldn't understand your request. Please provide more details.")
+            return
+
+    # The model may answer with city names, the API wants codes
+    params_dict = resolve_params(params_dict)
+
+    # Cheapest-day and price-cap questions about a month are a calendar lookup
+    fares = fare_answer(params_dict, task, lambda params: query(**params))
+    if fares is not None:
+        log("FARE_CALENDAR", params_dict)
+        print("|> " + fares)
         return
 
     # Call the Skyscanner API with extracted parameters
     result = query(**params_dict)
     log("API_OUT", result[:800])
 
-    # Summarize the JSON output using GPT-4 Turbo
-    summary_response = client.chat.completions.create(
-        # model="gpt-4-turbo",
-        model="gemini-2.0-flash",
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a helpful travel planning assistant.",
-            },
-            {
-                "role": "user",
-                "content": f"Summarize the following JSON output and present the flights to the user in a conversational format in 3 to 4 lines: \n{result}",
-            },
-        ],
-        max_tokens=1024,
+    # Summarize the JSON output using GPT-4 Turbo, printing tokens as they arrive
+    summary_messages = [
+        {
+            "role": "system",
+            "content": "You are a helpful travel planning assistant.",
+        },
+        {
+            "role": "user",
+            "content": f"Summarize the following flights table and present the flights to the user in a conversational format in 3 to 4 lines: \n{result}",
+        },
+    ]
+
+    def summary_stream():
+        stream = openai_client.get().chat.completions.create(
+            # model="gpt-4-turbo",
+            model="gemini-2.0-flash",
+            messages=summary_messages,
+            max_tokens=1024,
+            stream=True,
+        )
+        return (chunk.choices[0].delta.content for chunk in stream if chunk.choices)
+
+    printer = ConsolePrinter(end="\n")
+    summary = stream_text(
+        # Sampled at the default temperature, so only cached with LLM_CACHE_SAMPLED=1
+        cached_stream(cache_model("gemini-2.0-flash"), summary_messages, summary_stream, "summarization"),
+        printer,
+        stage="summarization",
     )
-
-    summary = summary_response.choices[0].message.content.strip()
-
-    # Print the summarized output
-    print("|> ", end="")
-    print(summary)
+    printer.finish()
+    log("SUMMARY", summary)
+    if startup.first_turn(time.perf_counter() - start):
+        log("STARTUP", startup.summary())
 
 
 if __name__ == "__main__":
+    startup.since_start("imports")
     os.system("cls")
+    openai_client.start()
     print("|> ", end="")
     print("Hello. I am a travel planning assistant. How can I help you today?")
+    startup.since_start("ready")
     while True:
         chat()
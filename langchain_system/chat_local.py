@@ -1,7 +1,22 @@
-import requests
-import sys, os, json
+import sys, os, time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from assistant.warmup import startup, Preload, warm_ollama, OLLAMA_KEEP_ALIVE
+from skyscanner.polling import IncrementalSearch
+from skyscanner.results import Itinerary, parser
+from skyscanner.quota import describe
+from skyscanner.places import resolve_params
+from skyscanner.details import get_details
+from assistant.prefetch import claim, get_prefetcher
+from assistant.prompts import SYSTEM_PROMPTS, wrap_tool_result
+from assistant.dispatch import run_tool_calls
+from assistant.compact import compact_results
+from assistant.memory import ConversationMemory
+from assistant.telemetry import span, record_llm, record_search, serve
+from assistant.streaming import ConsolePrinter, stream_message
+from assistant.llm_cache import model_id, cached_stream, at_temperature_zero
+from assistant.tools import batch_flights, fare_calendar, flight_details
 from langchain_core.tools import tool
-from langchain_ollama.chat_models import ChatOllama
 from langchain.globals import set_debug
 from dotenv import load_dotenv
 load_dotenv()
@@ -13,6 +28,18 @@ def log(context, message):
     if DEBUG:
         print(f"\n[LOG:{context}] {message}\n")
 
+# Print the first IndiGo options while the search session is still polling
+def show_early_results(batch, limit):
+    itineraries = [item for item in batch if isinstance(item, Itinerary)][:limit]
+    for itinerary in itineraries:
+        leg = itinerary.legs[0]
+        print(
+            f"|> (early result) IndiGo 6E {leg.flight_number}, "
+            f"{leg.departure[11:16]} -> {leg.arrival[11:16]}, {itinerary.price}"
+        )
+    return len(itineraries)
+
+
 # Function to query the anner API
 @tool
 def one_way_flight(
@@ -22,19 +49,14 @@ def one_way_flight(
     Queries the API for one-way flights.
 
     Parameters:
-    - 'fromEntityId' Required : 'BOM'(mumbai) | 'DEL'(delhi) | 'PNQ'(pune) | 'BLR'(bengaluru) | 'MAA'(chennai) | 'CCU'(kolkata) | 'HYD'(hyderabad) | 'ATQ'(amritsar) | 'SLV'(shimla) | 'PAT'(patna),
-    - 'toEntityId': 'BOM'(mumbai) | 'DEL'(delhi) | 'PNQ'(pune) | 'BLR'(bengaluru) | 'MAA'(chennai) | 'CCU'(kolkata) | 'HYD'(hyderabad) | 'ATQ'(amritsar) | 'SLV'(shimla) | 'PAT'(patna),
+    - 'fromEntityId' Required : departure city, airport name or IATA code,
+    - 'toEntityId': arrival city, airport name or IATA code,
     - 'departDate': 'YYYY-MM-DD',
     - 'wholeMonthDepart': 'YYYY-MM'(Use this or 'departDate' not Both),
 
     Returns:
     str: A string of the flight search results.
     """
-    url = "https://sky-scanner3.p.rapidapi.com/flights/search-one-way"
-    headers = {
-        "x-rapidapi-key": f"{os.getenv('SKY_SCANNER_API_KEY')}",
-        "x-rapidapi-host": "sky-scanner3.p.rapidapi.com",
-    }
     querystring = {
         "fromEntityId": fromEntityId,
         "toEntityId": toEntityId,
@@ -44,105 +66,93 @@ def one_way_flight(
         "locale": "en-GB",
         "currency": "INR",
     }
-    response = requests.get(url, headers=headers, params=querystring)
-    if response.status_code != 200:
-        return f"Error: {response.json()}"
-    response_dict = response.json()
-    flight_info = []
-
-    # If the user wants to search for a specific date
-    if (wholeMonthDepart is None) and (departDate is not None):
-        for itinerary in response_dict["data"]["itineraries"]:
-            for leg in itinerary["legs"]:
-                flight_details = {
-                    # "id": itinerary["id"],
-                    "price": itinerary["price"]["formatted"],
-                    "origin": leg["origin"]["name"],
-                    "destination": leg["destination"]["name"],
-                    "duration": leg["durationInMinutes"],
-                    "departure": leg["departure"],
-                    "arrival": leg["arrival"],
-                    "carrier": leg["carriers"]["marketing"][0]["name"],
-                    "flight_number": leg["segments"][0]["flightNumber"],
-                }
-                if leg["carriers"]["marketing"][0]["name"] == "IndiGo":
-                    flight_info.append(flight_details)
-        return str({"flight_info": flight_info[:], "isWholeMonthDepart": False})
-    # If the user wants to search for the whole month
-    else:
-        for flight_quote in response_dict["data"]["flightQuotes"]["results"]:
-            quote_info = {
-                # "id": flight_quote["id"],
-                "price": flight_quote["content"]["price"],
-                # "rawPrice": flight_quote["content"]["rawPrice"],
-                "direct": flight_quote["content"]["direct"],
-                "originAirport": flight_quote["content"]["outboundLeg"][
-                    "originAirport"
-                ]["name"],
-                "destinationAirport": flight_quote["content"]["outboundLeg"][
-                    "destinationAirport"
-                ]["name"],
-                "departureDate": flight_quote["content"]["outboundLeg"][
-                    "localDepartureDate"
-                ],
-                "departureDateLabel": flight_quote["content"]["outboundLeg"][
-                    "localDepartureDateLabel"
-                ],
-            }
-            flight_info.append(quote_info)
-        return str({"flight_info": flight_info[:], "isWholeMonthDepart": True})
-    return ""
-
-
-tools = [one_way_flight]
+    querystring = resolve_params(querystring)
+    with span("search.http") as stage:
+        stage.set("search.prefetched", claim(querystring))
+        search = IncrementalSearch(querystring, parse=parser())
+        shown = 0
+        for batch in search:
+            shown += show_early_results(batch, limit=3 - shown)
+        record_search(stage, search.results)
+    if search.error is not None:
+        return f"Error: {describe(search.error)}"
+    get_details().remember(search.results)
+    with span("search.compact") as stage:
+        result, stats = compact_results(search.items, departDate, wholeMonthDepart)
+        stage.update({"compact.rows": stats["rows"], "compact.tokens": stats["compact_tokens"]})
+    log("COMPACT", stats)
+    return result
+
+
+tools = [one_way_flight, fare_calendar, batch_flights, flight_details]
 
 # ---------------------------- Chat ----------------------------
 
 set_debug(DEBUG)
-llm = ChatOllama(model="llama3.1")
-llm_with_tools = llm.bind_tools(tools)
 
-from langchain_core.messages import HumanMessage, ToolMessage, SystemMessage
 
-messages = [
-    SystemMessage(
-        """You are IndiGo's friendly flight booking chatbot. Follow these rules strictly:
+def load_llm():
+    # Imported here, the provider package is most of a cold start
+    from langchain_ollama.chat_models import ChatOllama
+
+    llm = ChatOllama(model="llama3.1", keep_alive=OLLAMA_KEEP_ALIVE)
+    llm_with_tools = llm.bind_tools(tools)
+    # Extraction runs at temperature 0 so its replies can be cached, summaries keep the model's own
+    extractor = at_temperature_zero(llm).bind_tools(tools)
+    model_ids = {"extraction": model_id(extractor), "summarization": model_id(llm_with_tools)}
+    return llm, llm_with_tools, extractor, model_ids
+
 
-1. For greetings or general questions, respond naturally WITHOUT using any tools
-2. Only use the one_way_flight tool when ALL these conditions are met:
-   - User has specifically asked about booking/searching flights
-   - You have collected: origin city, destination city, and either a specific date or month
-   - You have confirmed these details with the user
+# Built, and the model loaded into Ollama, while the user types the first message
+models = Preload(load_llm, warm=lambda loaded: warm_ollama(loaded[0].model, loaded[0].base_url))
 
-Be casual and friendly in conversation. Start by greeting and asking how you can help with flight bookings.
-DO NOT call tools for general conversation."""
-    ),
-]
+# Recent turns verbatim, older ones folded into a summary written by the same model
+memory = ConversationMemory(SYSTEM_PROMPTS["ollama"])
 
 if __name__ == "__main__":
+    startup.since_start("imports")
     os.system("cls")
+    models.start()
+    serve()
+    startup.since_start("ready")
     while True:
         query = input(">> ")
         if query.lower() == "exit":
             break
 
-        messages.append(HumanMessage(content=query))
-        result = llm_with_tools.invoke(messages)
-        messages.append(result)
-
-        # Only process tool calls if they exist and are actually needed
-        if hasattr(result, 'tool_calls') and result.tool_calls:
-            for tool_call in result.tool_calls:
-                selected_tool = {"one_way_flight": one_way_flight}[tool_call["name"].lower()]
-                tool_msg = selected_tool.invoke(tool_call)
-
-                if "'wholeMonthDepart': True" in tool_msg.content:
-                    tool_msg.content = "Present the flight quotes in a friendly way and ask user to pick a date:\n" + tool_msg.content
-                else:
-                    tool_msg.content = "Present the flight details in a friendly way:\n" + tool_msg.content
-
-                messages.append(tool_msg)
-            result = llm_with_tools.invoke(messages)
-            messages.append(result)
-
-        print(f"|> {result.content}\n")
+        start = time.perf_counter()
+        # Only the first turn can wait here, for the background load
+        llm, llm_with_tools, extractor, model_ids = models.get()
+        memory.summarizer = llm
+
+        # Replies are printed as they stream in
+        printer = ConsolePrinter()
+        with span("chat.turn"):
+            with span("chat.memory"):
+                memory.add_user(query)
+            prompt = memory.prompt()
+            with span("chat.extraction") as stage:
+                result = stream_message(cached_stream(model_ids["extraction"], prompt, lambda: extractor.stream(prompt), "extraction"), printer)
+                record_llm(stage, prompt, result)
+            memory.append(result)
+            if not result.tool_calls and get_prefetcher() is not None:
+                # A confirmation question: search while the user reads it
+                log("PREFETCH", get_prefetcher().prefetch(result.content))
+
+            # Only process tool calls if they exist and are actually needed
+            if hasattr(result, 'tool_calls') and result.tool_calls:
+                with span("chat.search"):
+                    tool_msgs, timings = run_tool_calls(result.tool_calls, {"one_way_flight": one_way_flight, "fare_calendar": fare_calendar, "batch_flights": batch_flights, "flight_details": flight_details})
+                    log("TOOL_TIMINGS", timings)
+                    for tool_msg in tool_msgs:
+                        tool_msg.content = wrap_tool_result("ollama", tool_msg.content)
+                        memory.append(tool_msg)
+                prompt = memory.prompt()
+                with span("chat.summarization") as stage:
+                    result = stream_message(cached_stream(model_ids["summarization"], prompt, lambda: llm_with_tools.stream(prompt), "summarization"), printer)
+                    record_llm(stage, prompt, result)
+                memory.append(result)
+
+        printer.finish()
+        if startup.first_turn(time.perf_counter() - start):
+            log("STARTUP", startup.summary())
@@ -0,0 +1 @@
+from skyscanner import client
@@ -0,0 +1,233 @@
+"""
+Async Skyscanner client for the asyncio chat engine
+"""
+
+import os, asyncio
+import httpx
+from skyscanner.client import (
+    HOST,
+    BASE_URL,
+    SEARCH_ONE_WAY,
+    SEARCH_INCOMPLETE,
+    CONNECT_TIMEOUT,
+    READ_TIMEOUT,
+    POOL_SIZE,
+    RETRIES,
+    BACKOFF,
+    CHUNK_SIZE,
+    CACHE_ENABLED,
+    REPLAY,
+    RETRY_STATUSES,
+)
+from skyscanner.cache import get_cache
+from skyscanner.fare_calendar import update_calendar
+from skyscanner.coalesce import AsyncSingleFlight, search_key
+from skyscanner.quota import INTERACTIVE, RateLimited, get_limiter
+from skyscanner.capture import get_capture, search_kind
+from skyscanner.polling import (
+    POLL_INTERVAL,
+    MAX_POLLS,
+    STABLE_POLLS,
+    ResultSet,
+    error_body,
+    from_cache,
+)
+
+# Concurrent requests allowed against RapidAPI from one process
+MAX_CONCURRENCY = int(os.getenv("SKY_SCANNER_MAX_CONCURRENCY", str(POOL_SIZE)))
+
+
+def _cached(body, cache_status):
+    return httpx.Response(
+        200,
+        content=body,
+        headers={"Content-Type": "application/json", "X-Cache": cache_status},
+    )
+
+
+class AsyncSkyScannerClient:
+    """httpx.AsyncClient with the same pool, timeout, retry and cache settings
+    as the sync client, plus a semaphore so bursts queue instead of piling up."""
+
+    def __init__(
+        self,
+        api_key=None,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        pool_size=POOL_SIZE,
+        retries=RETRIES,
+        backoff=BACKOFF,
+        max_concurrency=MAX_CONCURRENCY,
+        cache=None,
+        limiter=None,
+    ):
+        self.cache = cache
+        self.limiter = limiter
+        self.retries = retries
+        self.backoff = backoff
+        self.concurrency = asyncio.Semaphore(max_concurrency)
+        self.flights = AsyncSingleFlight()
+        self.http = httpx.AsyncClient(
+            base_url=BASE_URL,
+            headers={
+                "x-rapidapi-key": f"{api_key or os.getenv('SKY_SCANNER_API_KEY')}",
+                "x-rapidapi-host": HOST,
+            },
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+        )
+
+    async def get(self, path, params=None, stream=False, priority=INTERACTIVE):
+        """With stream=True the caller must read and aclose() the response."""
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        request = self.http.build_request("GET", path, params=params)
+        async with self.concurrency:
+            for attempt in range(self.retries + 1):
+                if self.limiter is not None:
+                    await self.limiter.aacquire(priority)
+                try:
+                    response = await self.http.send(request, stream=stream)
+                except httpx.TransportError:
+                    if attempt == self.retries:
+                        raise
+                else:
+                    if self.limiter is not None:
+                        self.limiter.update(response.status_code, response.headers)
+                    if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                        return response
+                    await response.aclose()
+                    if response.status_code == 429 and self.limiter is not None:
+                        # The limiter holds everyone back until Retry-After
+                        continue
+                await asyncio.sleep(self.backoff * (2**attempt))
+
+    async def search_one_way(self, stream=False, priority=INTERACTIVE, **params):
+        if self.cache is not None:
+            body = self.cache.get(params)
+            if body is not None:
+                return _cached(body, "HIT")
+        try:
+            response = await self.get(SEARCH_ONE_WAY, params, stream=stream, priority=priority)
+        except RateLimited:
+            body = self.cache.get_stale(params) if self.cache is not None else None
+            if body is None:
+                raise
+            return _cached(body, "STALE")
+        if response.status_code == 429 and self.cache is not None:
+            body = self.cache.get_stale(params)
+            if body is not None:
+                await response.aclose()
+                return _cached(body, "STALE")
+        if self.cache is not None and not stream and response.status_code == 200:
+            self.cache.put(params, response.content)
+        return response
+
+    async def search_incomplete(self, sessionId, stream=False, priority=INTERACTIVE, **params):
+        params["sessionId"] = sessionId
+        return await self.get(SEARCH_INCOMPLETE, params, stream=stream, priority=priority)
+
+    async def _read(self, response, results):
+        before = results.seen
+        try:
+            results.start()
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                results.feed(chunk)
+            return results.seen - before
+        finally:
+            await response.aclose()
+
+    async def search(
+        self,
+        params,
+        parse=None,
+        interval=POLL_INTERVAL,
+        max_polls=MAX_POLLS,
+        stable_polls=STABLE_POLLS,
+        priority=INTERACTIVE,
+    ):
+        """
+        Search, streaming each response through a ResultSet, and poll the
+        session to completion (same stop rules as IncrementalSearch).
+        Returns (ResultSet, error); the ResultSet still carries the response
+        statuses when the search failed. Concurrent calls with the same
+        params and parser share one upstream search and its ResultSet.
+        """
+        return await self.flights.do(
+            search_key(params, parse),
+            lambda: self._search(params, parse, interval, max_polls, stable_polls, priority),
+        )
+
+    async def _search(self, params, parse, interval, max_polls, stable_polls, priority):
+        capture = get_capture()
+        results = ResultSet(parse, keep_raw=self.cache is not None or capture is not None)
+        try:
+            response = await self.search_one_way(stream=True, priority=priority, **params)
+        except RateLimited as e:
+            return results, e
+        results.record(response)
+        if response.status_code != 200:
+            await response.aread()
+            await response.aclose()
+            return results, error_body(response)
+        hit = from_cache(response)
+        await self._read(response, results)
+        if "context" not in results.values and results.kind is None:
+            return results, results.values.get("message", "empty response")
+        sid = results.session_id
+        polls = stable = added = 0
+        while (
+            results.status == "incomplete"
+            and sid
+            and polls < max_polls
+            and stable < stable_polls
+        ):
+            await asyncio.sleep(interval)
+            polls += 1
+            try:
+                response = await self.search_incomplete(sid, stream=True, priority=priority)
+            except RateLimited:
+                # Keep what the earlier polls found
+                break
+            results.record(response)
+            if response.status_code != 200:
+                await response.aclose()
+                break
+            fresh = await self._read(response, results)
+            added += fresh
+            stable = 0 if fresh else stable + 1
+        if results.kind == "quotes" and params.get("wholeMonthDepart"):
+            update_calendar(params, results.items, complete=results.status != "incomplete")
+        # As in IncrementalSearch: a failed poll must not renew a cached partial result
+        if self.cache is not None and (added or not hit):
+            self.cache.put(params, results.payload_text(session=False).encode("utf-8"))
+        if capture is not None and (added or not hit):
+            capture.record(search_kind(params), params, results)
+        return results, None
+
+    async def aclose(self):
+        await self.http.aclose()
+
+
+_client = None
+
+
+def make_async_client():
+    """A client with the process-wide settings, bound to the running event loop."""
+    client = AsyncSkyScannerClient(
+        cache=get_cache() if CACHE_ENABLED else None, limiter=get_limiter()
+    )
+    if REPLAY:
+        from skyscanner.replay import install_async
+
+        install_async(client)
+    return client
+
+
+def get_async_client():
+    """One client per process; create it from inside the running event loop."""
+    global _client
+    if _client is None:
+        _client = make_async_client()
+    return _client
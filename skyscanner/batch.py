@@ -0,0 +1,154 @@
+"""
+Batch search: fan several routes and departure dates out concurrently and
+merge everything into one ranked, de-duplicated result set
+"""
+
+import os, math, asyncio, datetime, threading
+from skyscanner.cache import cache_key
+from skyscanner.aio import get_async_client, make_async_client
+
+BATCH_CONCURRENCY = int(os.getenv("SKY_SCANNER_BATCH_CONCURRENCY", "4"))
+# Minimum gap between sub-search launches; doubles after a 429, halves back after successes
+BATCH_SPACING = float(os.getenv("SKY_SCANNER_BATCH_SPACING", "0.1"))
+MAX_BATCH_SPACING = float(os.getenv("SKY_SCANNER_BATCH_MAX_SPACING", "2"))
+MAX_SEARCHES = int(os.getenv("SKY_SCANNER_BATCH_MAX_SEARCHES", "12"))
+
+
+def date_range(start, end):
+    """Every YYYY-MM-DD from start to end inclusive."""
+    day = datetime.date.fromisoformat(start)
+    last = datetime.date.fromisoformat(end)
+    dates = []
+    while day <= last:
+        dates.append(day.isoformat())
+        day += datetime.timedelta(days=1)
+    return dates
+
+
+def expand(origins, destinations, dates, base=None, max_searches=MAX_SEARCHES):
+    """
+    One search-one-way params dict per (from, to, date). Same-airport pairs
+    are skipped and sub-searches sharing a cache key are merged. Raises
+    ValueError past max_searches so the caller can narrow the request.
+    """
+    searches = {}
+    for origin in origins:
+        for destination in destinations:
+            if origin.strip().upper() == destination.strip().upper():
+                continue
+            for date in dates:
+                params = dict(base or {}, fromEntityId=origin, toEntityId=destination, departDate=date)
+                searches.setdefault(cache_key(params), params)
+    if len(searches) > max_searches:
+        raise ValueError(f"{len(searches)} searches requested, the limit is {max_searches}")
+    return list(searches.values())
+
+
+class Scheduler:
+    """Bounded concurrency plus a launch spacing that backs off when RapidAPI answers 429."""
+
+    def __init__(self, concurrency=BATCH_CONCURRENCY, spacing=BATCH_SPACING):
+        self.limiter = asyncio.Semaphore(concurrency)
+        self.base = spacing
+        self.spacing = spacing
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+                now = self._next
+            self._next = now + self.spacing
+
+    def throttled(self):
+        self.spacing = min(max(self.spacing * 2, 0.1), MAX_BATCH_SPACING)
+
+    def relaxed(self):
+        self.spacing = max(self.base, self.spacing / 2)
+
+
+def _identity(item):
+    """The same flight found by two sub-searches is one result."""
+    legs = getattr(item, "legs", None)
+    if legs is None:
+        return item.id
+    return tuple((leg.flight_number, leg.departure) for leg in legs)
+
+
+def _rank(pair):
+    item = pair[1]
+    price = item.raw_price if item.raw_price is not None else math.inf
+    return price, sum(leg.duration for leg in getattr(item, "legs", ()))
+
+
+class BatchResult:
+    """
+    `items` holds (params, item) pairs, cheapest then shortest first, each
+    flight once. `errors` holds (params, error) for the sub-searches that
+    failed; `results` keeps every (params, ResultSet, error) for tracing.
+    """
+
+    __slots__ = ("searches", "items", "errors", "results")
+
+    def __init__(self, outcomes):
+        self.results = outcomes
+        self.searches = [params for params, _, _ in outcomes]
+        self.errors = [(params, error) for params, _, error in outcomes if error is not None]
+        best = {}
+        for params, results, error in outcomes:
+            if error is not None:
+                continue
+            for item in results.items:
+                key = _identity(item)
+                if key not in best or _rank((params, item)) < _rank(best[key]):
+                    best[key] = (params, item)
+        self.items = sorted(best.values(), key=_rank)
+
+
+async def batch_search(searches, parse=None, client=None, concurrency=BATCH_CONCURRENCY, spacing=BATCH_SPACING):
+    """Run every sub-search through AsyncSkyScannerClient.search and merge them."""
+    client = client or get_async_client()
+    scheduler = Scheduler(concurrency, spacing)
+
+    async def run(params):
+        async with scheduler.limiter:
+            await scheduler.wait()
+            try:
+                results, error = await client.search(params, parse=parse)
+            except Exception as e:
+                return params, None, e
+        if results is not None and any(status == 429 for status, _ in results.responses):
+            scheduler.throttled()
+        else:
+            scheduler.relaxed()
+        return params, results, error
+
+    return BatchResult(await asyncio.gather(*(run(params) for params in searches)))
+
+
+_loop = None
+_loop_client = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, daemon=True, name="batch-search").start()
+    return _loop
+
+
+def batch_search_sync(searches, parse=None, timeout=None, **kwargs):
+    """batch_search for threaded callers, run on a private event loop with its own client."""
+
+    async def run():
+        global _loop_client
+        if _loop_client is None:
+            _loop_client = make_async_client()
+        return await batch_search(searches, parse, client=_loop_client, **kwargs)
+
+    return asyncio.run_coroutine_threadsafe(run(), _background_loop()).result(timeout)
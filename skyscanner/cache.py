@@ -0,0 +1,201 @@
+"""
+TTL + LRU cache for search-one-way responses
+"""
+
+import os, time, sqlite3, threading
+from collections import OrderedDict
+
+# Exact-date quotes move faster than whole-month calendars
+DATE_TTL = float(os.getenv("SKY_SCANNER_CACHE_DATE_TTL", "600"))
+MONTH_TTL = float(os.getenv("SKY_SCANNER_CACHE_MONTH_TTL", "3600"))
+MAX_ENTRIES = int(os.getenv("SKY_SCANNER_CACHE_MAX_ENTRIES", "512"))
+MAX_BYTES = int(os.getenv("SKY_SCANNER_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+DISK_PATH = os.getenv("SKY_SCANNER_CACHE_PATH")
+# Expired entries are kept this much longer as a fallback when RapidAPI is rate limiting
+STALE_TTL = float(os.getenv("SKY_SCANNER_CACHE_STALE_TTL", "86400"))
+
+UPPERCASE_PARAMS = ("fromEntityId", "toEntityId", "market", "currency", "cabinClass")
+
+
+def normalize_params(params):
+    """Drop empty values and canonicalise case so equivalent searches share a key."""
+    norm = {}
+    for k, v in params.items():
+        if v is None:
+            continue
+        v = str(v).strip()
+        if not v:
+            continue
+        norm[k] = v.upper() if k in UPPERCASE_PARAMS else v
+    return norm
+
+
+def cache_key(params):
+    norm = normalize_params(params)
+    return "&".join(f"{k}={norm[k]}" for k in sorted(norm))
+
+
+def ttl_for(params, date_ttl=DATE_TTL, month_ttl=MONTH_TTL):
+    return month_ttl if params.get("wholeMonthDepart") else date_ttl
+
+
+class DiskBackend:
+    """SQLite store so cached quotes survive restarts."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, expires REAL, body BLOB)"
+        )
+        self.conn.commit()
+
+    def get(self, key, now, stale_ttl=0):
+        row = self.conn.execute(
+            "SELECT expires, body FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[0] + stale_ttl <= now:
+            self.delete(key)
+            return None
+        return row[0], row[1]
+
+    def put(self, key, expires, body):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, expires, body)
+        )
+        self.conn.commit()
+
+    def delete(self, key):
+        self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self.conn.commit()
+
+    def prune(self, now):
+        self.conn.execute("DELETE FROM responses WHERE expires <= ?", (now,))
+        self.conn.commit()
+
+
+class ResponseCache:
+    """
+    In-memory LRU bounded by entry count and total body bytes, with per-entry
+    expiry and an optional DiskBackend behind it. Expired entries linger
+    for `stale_ttl` so get_stale() can stand in when upstream refuses.
+    """
+
+    def __init__(
+        self,
+        max_entries=MAX_ENTRIES,
+        max_bytes=MAX_BYTES,
+        date_ttl=DATE_TTL,
+        month_ttl=MONTH_TTL,
+        disk_path=DISK_PATH,
+        stale_ttl=STALE_TTL,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.date_ttl = date_ttl
+        self.month_ttl = month_ttl
+        self.stale_ttl = stale_ttl
+        self.disk = DiskBackend(disk_path) if disk_path else None
+        self._entries = OrderedDict()  # key -> (expires, body)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+        if self.disk:
+            self.disk.prune(time.time() - stale_ttl)
+
+    def get(self, params):
+        key = cache_key(params)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                if entry[0] + self.stale_ttl <= now:
+                    self._drop(key)
+                self.expirations += 1
+            elif self.disk:
+                stored = self.disk.get(key, now, self.stale_ttl)
+                if stored is not None:
+                    self._insert(key, stored[0], stored[1])
+                    if stored[0] > now:
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return stored[1]
+            self.misses += 1
+            return None
+
+    def get_stale(self, params):
+        """The last body for these params even if expired (within stale_ttl), else None."""
+        key = cache_key(params)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self.disk:
+                entry = self.disk.get(key, now, self.stale_ttl)
+            if entry is None or entry[0] + self.stale_ttl <= now:
+                return None
+            self.stale_hits += 1
+            return entry[1]
+
+    def put(self, params, body):
+        key = cache_key(params)
+        expires = time.time() + ttl_for(params, self.date_ttl, self.month_ttl)
+        with self._lock:
+            self._insert(key, expires, body)
+            if self.disk:
+                self.disk.put(key, expires, body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "stale_hits": self.stale_hits,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+    def _insert(self, key, expires, body):
+        if key in self._entries:
+            self._drop(key)
+        if len(body) > self.max_bytes:
+            return
+        self._entries[key] = (expires, body)
+        self._bytes += len(body)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key):
+        _, body = self._entries.pop(key)
+        self._bytes -= len(body)
+
+
+_cache = None
+_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
@@ -0,0 +1,149 @@
+"""
+Opt-in capture of upstream payloads for debugging and replay.
+
+Searches hand their finished ResultSet to record(), which only samples
+and enqueues; a background thread serialises, gzips and writes each one
+to SKY_SCANNER_CAPTURE_DIR as <time>-<session>-<request>-<kind>.json.gz,
+deleting the oldest captures past the file and byte budgets. A capture is
+the search-one-way document itself (plus a "capture" key with its
+params), so replay.py can serve it as a fixture.
+"""
+
+import os, re, gzip, glob, json, time, queue, random, hashlib, itertools, threading, contextvars
+from collections import Counter, deque
+from contextlib import contextmanager
+from skyscanner.cache import cache_key, normalize_params
+
+CAPTURE_DIR = os.getenv("SKY_SCANNER_CAPTURE_DIR")  # unset: capture off
+# Fraction of searches captured
+CAPTURE_SAMPLE = float(os.getenv("SKY_SCANNER_CAPTURE_SAMPLE", "1"))
+MAX_FILES = int(os.getenv("SKY_SCANNER_CAPTURE_MAX_FILES", "200"))
+MAX_BYTES = int(os.getenv("SKY_SCANNER_CAPTURE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Captures waiting for the writer; more are dropped rather than slowing a search
+QUEUE_SIZE = int(os.getenv("SKY_SCANNER_CAPTURE_QUEUE", "64"))
+
+_session = contextvars.ContextVar("capture_session", default="default")
+_SAFE = re.compile(r"[^\w.-]")
+
+
+@contextmanager
+def session(session_id):
+    """Label captures made in this context (and threads started from it) with session_id."""
+    token = _session.set(_SAFE.sub("_", str(session_id)))
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+
+def current_session():
+    return _session.get()
+
+
+def search_kind(params):
+    return "month" if params.get("wholeMonthDepart") or not params.get("departDate") else "date"
+
+
+class Capture:
+    """Bounded ring of gzipped payloads in `directory`, written off the request path."""
+
+    def __init__(self, directory, sample=CAPTURE_SAMPLE, max_files=MAX_FILES, max_bytes=MAX_BYTES, queue_size=QUEUE_SIZE):
+        self.directory = directory
+        self.sample = sample
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.stats = Counter()
+        self._queue = queue.Queue(queue_size)
+        self._ids = itertools.count(1)
+        os.makedirs(directory, exist_ok=True)
+        # Oldest first, picking up captures left by earlier runs
+        paths = sorted(glob.glob(os.path.join(directory, "*.json.gz")), key=os.path.getmtime)
+        self._files = deque((path, os.path.getsize(path)) for path in paths)
+        self._bytes = sum(size for _, size in self._files)
+        threading.Thread(target=self._write_loop, daemon=True, name="capture").start()
+
+    def record(self, kind, params, source, session=None):
+        """
+        Queue one payload. `source` is the body bytes/str or anything with
+        payload_text() (a finished ResultSet), which is only called on the
+        writer thread. Returns False when not sampled or the queue is full.
+        """
+        if self.sample < 1 and random.random() >= self.sample:
+            self.stats["skipped"] += 1
+            return False
+        item = (time.time(), session or _session.get(), next(self._ids), kind, params, source)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return False
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is on disk."""
+        done = threading.Event()
+        self._queue.put(done, timeout=timeout)
+        return done.wait(timeout)
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            try:
+                self._write(*item)
+            except Exception:
+                self.stats["failed"] += 1
+
+    def _write(self, at, session, seq, kind, params, source):
+        body = source.payload_text() if hasattr(source, "payload_text") else source
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        digest = hashlib.sha1(cache_key(params).encode()).hexdigest()[:8]
+        meta = {"session": session, "request": seq, "kind": kind, "time": at, "params": normalize_params(params)}
+        body = body.lstrip()
+        if body.startswith(b"{"):
+            # Spliced in rather than re-parsed; replay only reads "data"
+            rest = body[1:]
+            sep = b"" if rest.lstrip().startswith(b"}") else b","
+            body = b'{"capture":' + json.dumps(meta).encode() + sep + rest
+        name = f"{int(at * 1000)}-{session}-{seq:06d}-{digest}-{kind}.json.gz"
+        path = os.path.join(self.directory, name)
+        with open(path + ".tmp", "wb") as f:
+            f.write(gzip.compress(body, compresslevel=6))
+        os.replace(path + ".tmp", path)
+        size = os.path.getsize(path)
+        self._files.append((path, size))
+        self._bytes += size
+        self.stats["written"] += 1
+        while self._files and (len(self._files) > self.max_files or self._bytes > self.max_bytes):
+            old, old_size = self._files.popleft()
+            self._bytes -= old_size
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+            self.stats["evicted"] += 1
+
+
+def latest(kind, directory=CAPTURE_DIR):
+    """Path of the newest capture of this kind in directory, or None."""
+    if not directory:
+        return None
+    paths = glob.glob(os.path.join(directory, f"*-{kind}.json.gz"))
+    return max(paths, key=os.path.getmtime) if paths else None
+
+
+_capture = None
+_lock = threading.Lock()
+
+
+def get_capture():
+    """The process-wide capture, or None unless SKY_SCANNER_CAPTURE_DIR is set."""
+    global _capture
+    if _capture is None and CAPTURE_DIR:
+        with _lock:
+            if _capture is None:
+                _capture = Capture(CAPTURE_DIR)
+    return _capture
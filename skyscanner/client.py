@@ -0,0 +1,187 @@
+"""
+Shared Skyscanner (RapidAPI) client with a pooled keep-alive session
+"""
+
+import os, threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+from skyscanner.cache import get_cache
+from skyscanner.quota import INTERACTIVE, RateLimited, get_limiter
+
+load_dotenv()
+
+HOST = "sky-scanner3.p.rapidapi.com"
+BASE_URL = f"https://{HOST}"
+
+SEARCH_ONE_WAY = "/flights/search-one-way"
+SEARCH_INCOMPLETE = "/flights/search-incomplete"
+FLIGHT_DETAIL = "/flights/detail"
+AUTO_COMPLETE = "/flights/auto-complete"
+
+# Tunables (overridable through .env)
+CONNECT_TIMEOUT = float(os.getenv("SKY_SCANNER_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("SKY_SCANNER_READ_TIMEOUT", "20"))
+POOL_SIZE = int(os.getenv("SKY_SCANNER_POOL_SIZE", "16"))
+RETRIES = int(os.getenv("SKY_SCANNER_RETRIES", "3"))
+BACKOFF = float(os.getenv("SKY_SCANNER_BACKOFF", "0.3"))
+CHUNK_SIZE = int(os.getenv("SKY_SCANNER_CHUNK_SIZE", "16384"))
+CACHE_ENABLED = os.getenv("SKY_SCANNER_CACHE", "1") != "0"
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Serve everything from the captured fixtures (skyscanner/replay.py)
+REPLAY = os.getenv("SKY_SCANNER_REPLAY", "0") == "1"
+
+
+class SkyScannerClient:
+    """
+    One requests.Session per process: sockets to RapidAPI are kept alive and
+    reused across chat turns instead of paying a TCP+TLS handshake per search.
+    With a RateLimiter every request waits for a slot in priority order and
+    429s are retried through it rather than by urllib3.
+    """
+
+    def __init__(
+        self,
+        api_key=None,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        pool_size=POOL_SIZE,
+        retries=RETRIES,
+        backoff=BACKOFF,
+        cache=None,
+        limiter=None,
+    ):
+        self.cache = cache
+        self.limiter = limiter
+        self.retries = retries
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self.session.headers.update(
+            {
+                "x-rapidapi-key": f"{api_key or os.getenv('SKY_SCANNER_API_KEY')}",
+                "x-rapidapi-host": HOST,
+                "Connection": "keep-alive",
+            }
+        )
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES if limiter is None else RETRY_STATUSES[1:],
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session.mount(BASE_URL, adapter)
+
+    def get(self, path, params=None, priority=INTERACTIVE, **kwargs):
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        kwargs.setdefault("timeout", self.timeout)
+        if self.limiter is None:
+            return self.session.get(BASE_URL + path, params=params, **kwargs)
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire(priority)
+            response = self.session.get(BASE_URL + path, params=params, **kwargs)
+            self.limiter.update(response.status_code, response.headers)
+            if response.status_code != 429 or attempt == self.retries:
+                return response
+            response.close()
+
+    def search_one_way(self, stream=False, priority=INTERACTIVE, **params):
+        """
+        With stream=True the body is left on the socket for an incremental
+        reader, and caching the result is up to that reader. When RapidAPI
+        is rate limiting, an expired cached result is returned instead
+        (X-Cache: STALE) if there is one.
+        """
+        if self.cache is not None:
+            body = self.cache.get(params)
+            if body is not None:
+                return cached_response(body, BASE_URL + SEARCH_ONE_WAY)
+        try:
+            response = self.get(SEARCH_ONE_WAY, params, priority=priority, stream=stream)
+        except RateLimited:
+            stale = self._stale(params)
+            if stale is None:
+                raise
+            return stale
+        if response.status_code == 429:
+            stale = self._stale(params)
+            if stale is not None:
+                response.close()
+                return stale
+        if self.cache is not None and not stream and response.status_code == 200:
+            self.cache.put(params, response.content)
+        return response
+
+    def _stale(self, params):
+        body = self.cache.get_stale(params) if self.cache is not None else None
+        if body is None:
+            return None
+        return cached_response(body, BASE_URL + SEARCH_ONE_WAY, "STALE")
+
+    def search_incomplete(self, sessionId, stream=False, priority=INTERACTIVE, **params):
+        params["sessionId"] = sessionId
+        return self.get(SEARCH_INCOMPLETE, params, priority=priority, stream=stream)
+
+    def flight_detail(self, token, itineraryId, currency="INR", priority=INTERACTIVE, **params):
+        params.update({"token": token, "itineraryId": itineraryId, "currency": currency})
+        return self.get(FLIGHT_DETAIL, params, priority=priority)
+
+    def auto_complete(self, query, **params):
+        params["query"] = query
+        return self.get(AUTO_COMPLETE, params)
+
+    def close(self):
+        self.session.close()
+
+
+def cached_response(body, url, cache_status="HIT"):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body
+    response._content_consumed = True
+    response.encoding = "utf-8"
+    response.url = url
+    response.headers["Content-Type"] = "application/json"
+    response.headers["X-Cache"] = cache_status
+    return response
+
+
+_client = None
+_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                client = SkyScannerClient(
+                    cache=get_cache() if CACHE_ENABLED else None, limiter=get_limiter()
+                )
+                if REPLAY:
+                    from skyscanner.replay import install
+
+                    install(client)
+                _client = client
+    return _client
+
+
+def search_one_way(**params):
+    return get_client().search_one_way(**params)
+
+
+def search_incomplete(sessionId, stream=False, **params):
+    return get_client().search_incomplete(sessionId, stream, **params)
+
+
+def flight_detail(token, itineraryId, currency="INR", **params):
+    return get_client().flight_detail(token, itineraryId, currency, **params)
+
+
+def auto_complete(query, **params):
+    return get_client().auto_complete(query, **params)
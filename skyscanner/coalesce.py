@@ -0,0 +1,45 @@
+"""
+Single-flight: identical searches in flight at the same time share one
+set of upstream requests and all receive its result
+"""
+
+import asyncio, threading
+from collections import Counter
+from skyscanner.cache import cache_key
+
+# "leaders": searches that went upstream, "coalesced": callers that joined one in flight
+COUNTS = Counter()
+_lock = threading.Lock()
+
+
+def search_key(params, parse=None):
+    """Normalised params plus the parser, since joiners get the leader's parsed items."""
+    return cache_key(params), getattr(parse, "key", parse)
+
+
+def count(coalesced):
+    with _lock:
+        COUNTS["coalesced" if coalesced else "leaders"] += 1
+
+
+class AsyncSingleFlight:
+    """Per event loop: the first caller for a key runs the search, later ones await the same task."""
+
+    def __init__(self):
+        self._inflight = {}
+
+    async def do(self, key, factory):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            count(False)
+        else:
+            count(True)
+        # A cancelled caller must not cancel the search for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
@@ -0,0 +1,221 @@
+"""
+Itinerary details (/flights/detail), fetched lazily for the flights the
+user asks about and cached by itineraryId
+"""
+
+import os, re, math, time, threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from skyscanner.client import get_client
+from skyscanner.capture import current_session
+from skyscanner.quota import INTERACTIVE, PREFETCH
+from skyscanner.results import Itinerary
+
+DETAIL_TTL = float(os.getenv("SKY_SCANNER_DETAIL_TTL", "600"))
+MAX_DETAILS = int(os.getenv("SKY_SCANNER_DETAIL_MAX_ENTRIES", "256"))
+# Flight numbers remembered from searches (all sessions together), so a follow-up can name one
+MAX_FLIGHTS = int(os.getenv("SKY_SCANNER_DETAIL_MAX_FLIGHTS", "1024"))
+# Cheapest results of each search whose details are fetched in the background. Off by default:
+# every prefetch is a paid /flights/detail request, asked about or not
+DETAIL_PREFETCH = int(os.getenv("SKY_SCANNER_DETAIL_PREFETCH", "0"))
+DETAIL_WORKERS = int(os.getenv("SKY_SCANNER_DETAIL_WORKERS", "4"))
+
+# "6E 651", "6E651" and "651" all name the same flight in the result tables
+_CARRIER_PREFIX = re.compile(r"^(?:[A-Z]{2}|[A-Z]\d|\d[A-Z])(?=\d)")
+
+
+def flight_key(flight_number):
+    return _CARRIER_PREFIX.sub("", re.sub(r"\s+", "", str(flight_number).upper()))
+
+
+class Segment:
+    __slots__ = ("flight_number", "origin", "destination", "departure", "arrival", "duration", "carrier", "operator")
+
+    def __init__(self, flight_number, origin, destination, departure, arrival, duration, carrier, operator):
+        self.flight_number = flight_number
+        self.origin = origin
+        self.destination = destination
+        self.departure = departure
+        self.arrival = arrival
+        self.duration = duration
+        self.carrier = carrier
+        self.operator = operator
+
+
+class Detail:
+    """The parts of a /flights/detail payload the chat answers from."""
+
+    __slots__ = ("id", "segments", "stops", "duration", "prices", "notes")
+
+    def __init__(self, id, segments, stops, duration, prices, notes):
+        self.id = id
+        self.segments = segments
+        self.stops = stops
+        self.duration = duration
+        self.prices = prices  # (agent, price) cheapest first
+        self.notes = notes
+
+    def layovers(self):
+        """(airport, minutes) between consecutive segments."""
+        out = []
+        for a, b in zip(self.segments, self.segments[1:]):
+            gap = _minutes(b.departure) - _minutes(a.arrival)
+            out.append((a.destination, gap))
+        return out
+
+
+def _minutes(stamp):
+    return time.mktime(time.strptime(stamp[:16], "%Y-%m-%dT%H:%M")) / 60
+
+
+def parse_detail(payload):
+    itinerary = payload["data"]["itinerary"]
+    segments, notes, stops, duration = [], [], 0, 0
+    for leg in itinerary["legs"]:
+        stops += leg.get("stopCount", 0)
+        duration += leg.get("duration", 0)
+        for seg in leg["segments"]:
+            marketing = seg.get("marketingCarrier") or {}
+            operating = seg.get("operatingCarrier") or marketing
+            segments.append(
+                Segment(
+                    seg["flightNumber"],
+                    seg["origin"]["displayCode"],
+                    seg["destination"]["displayCode"],
+                    seg["departure"],
+                    seg["arrival"],
+                    seg["duration"],
+                    marketing.get("name"),
+                    operating.get("name"),
+                )
+            )
+            for item in seg.get("goodToKnowItems") or ():
+                text = (item.get("body") or {}).get("value")
+                if text and text not in notes:
+                    notes.append(text)
+    prices = sorted(
+        (
+            (agent["name"].strip(), agent["price"])
+            for option in itinerary.get("pricingOptions") or ()
+            for agent in option.get("agents") or ()
+            if agent.get("price") is not None
+        ),
+        key=lambda p: p[1],
+    )
+    return Detail(itinerary["id"], segments, stops, duration, prices, notes)
+
+
+class DetailStore:
+    """
+    Remembers (token, itineraryId) for every flight a search returned, per
+    conversation (the capture.session() label), and caches parsed details
+    by itineraryId for everyone. Fetches run on a small thread
+    pool; a fetch already running for an itinerary is shared, so a
+    question about a prefetched flight just waits for it.
+    """
+
+    def __init__(self, client=None, ttl=DETAIL_TTL, max_details=MAX_DETAILS, max_flights=MAX_FLIGHTS, workers=DETAIL_WORKERS):
+        self.client = client
+        self.ttl = ttl
+        self.max_details = max_details
+        self.max_flights = max_flights
+        self.hits = 0
+        self.misses = 0
+        self._flights = OrderedDict()  # (session, flight key, date) -> (token, itineraryId)
+        self._details = OrderedDict()  # itineraryId -> (expires, Detail)
+        self._inflight = {}  # itineraryId -> Future
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="detail")
+
+    def remember(self, results, prefetch=DETAIL_PREFETCH, session=None):
+        """Note the itineraries of a finished search (a ResultSet) and prefetch the cheapest."""
+        token = results.values.get("token")
+        itineraries = [item for item in results.items if isinstance(item, Itinerary)]
+        if not token or not itineraries:
+            return []
+        session = session or current_session()
+        with self._lock:
+            for itinerary in itineraries:
+                date = itinerary.legs[0].departure[:10]
+                numbers = [leg.flight_number for leg in itinerary.legs]
+                for number in {"+".join(numbers), *numbers}:
+                    key = (session, flight_key(number), date)
+                    self._flights[key] = (token, itinerary.id)
+                    self._flights.move_to_end(key)
+            while len(self._flights) > self.max_flights:
+                self._flights.popitem(last=False)
+        cheapest = sorted(
+            itineraries,
+            key=lambda i: (i.raw_price if i.raw_price is not None else math.inf, sum(leg.duration for leg in i.legs)),
+        )[:prefetch]
+        return [self.fetch(token, i.id, PREFETCH) for i in cheapest]
+
+    def find(self, flight_number, date=None, session=None):
+        """(token, itineraryId) of the flight with this number (on date) this session saw last, or None."""
+        key = flight_key(flight_number)
+        session = session or current_session()
+        with self._lock:
+            for (owner, number, day), ref in reversed(self._flights.items()):
+                if owner == session and number == key and (date is None or day == date):
+                    return ref
+        return None
+
+    def forget(self, session=None):
+        """Drop the flights a finished conversation saw."""
+        session = session or current_session()
+        with self._lock:
+            for key in [key for key in self._flights if key[0] == session]:
+                del self._flights[key]
+
+    def cached(self, itinerary_id):
+        with self._lock:
+            entry = self._details.get(itinerary_id)
+            if entry is None or entry[0] <= time.time():
+                return None
+            self._details.move_to_end(itinerary_id)
+            return entry[1]
+
+    def fetch(self, token, itinerary_id, priority=INTERACTIVE):
+        """A Future for the Detail, already resolved when it is cached."""
+        detail = self.cached(itinerary_id)
+        with self._lock:
+            if detail is not None:
+                self.hits += 1
+                future = Future()
+                future.set_result(detail)
+                return future
+            future = self._inflight.get(itinerary_id)
+            if future is None:
+                self.misses += 1
+                future = self._executor.submit(self._fetch, token, itinerary_id, priority)
+                self._inflight[itinerary_id] = future
+            return future
+
+    def _fetch(self, token, itinerary_id, priority):
+        try:
+            response = (self.client or get_client()).flight_detail(token, itinerary_id, priority=priority)
+            if response.status_code != 200:
+                raise RuntimeError(f"flight detail failed with {response.status_code}: {response.text[:200]}")
+            detail = parse_detail(response.json())
+            with self._lock:
+                self._details[itinerary_id] = (time.time() + self.ttl, detail)
+                self._details.move_to_end(itinerary_id)
+                while len(self._details) > self.max_details:
+                    self._details.popitem(last=False)
+            return detail
+        finally:
+            with self._lock:
+                self._inflight.pop(itinerary_id, None)
+
+
+_store = None
+_lock = threading.Lock()
+
+
+def get_details():
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                _store = DetailStore()
+    return _store
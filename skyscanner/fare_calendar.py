@@ -0,0 +1,154 @@
+"""
+Whole-month fare calendar: per-day cheapest and cheapest-direct fares built
+from flightQuotes results, with a price-sorted index so "cheapest direct
+day" or "any day under 4000" is a lookup
+"""
+
+import os, time, bisect, threading
+from collections import OrderedDict
+from skyscanner.cache import MONTH_TTL, normalize_params
+from skyscanner.results import Quote, parse_quote
+
+MAX_CALENDARS = int(os.getenv("SKY_SCANNER_MAX_CALENDARS", "128"))
+
+
+class DayFare:
+    __slots__ = ("date", "label", "quotes", "cheapest", "cheapest_direct")
+
+    def __init__(self, date, label):
+        self.date = date
+        self.label = label
+        # quote id -> latest Quote seen for it
+        self.quotes = {}
+        self.cheapest = None
+        self.cheapest_direct = None
+
+    def refresh(self):
+        priced = [q for q in self.quotes.values() if q.raw_price is not None]
+        self.cheapest = min(priced, key=lambda q: q.raw_price, default=None)
+        self.cheapest_direct = min(
+            (q for q in priced if q.direct), key=lambda q: q.raw_price, default=None
+        )
+
+
+def _fares(day):
+    return None if day is None else {id: (q.raw_price, q.direct) for id, q in day.quotes.items()}
+
+
+class FareCalendar:
+    """
+    Quotes of one route-month folded into one DayFare per departure date.
+    update() merges newer quotes in place (same quote id replaces the old
+    price) and only recomputes the days they touch; update(replace=True)
+    takes a complete whole-month search as the new state of the month.
+    """
+
+    def __init__(self, origin, destination, month):
+        self.origin = origin
+        self.destination = destination
+        self.month = month
+        self.days = {}
+        self.updated = 0.0
+        self._index = {}
+
+    def update(self, quotes, replace=False):
+        """
+        Merge quotes (Quote objects or raw flightQuotes results); returns the
+        days changed. With replace, days and quotes missing from `quotes` are
+        dropped instead of keeping their older (possibly cheaper) fares.
+        """
+        days = {} if replace else self.days
+        changed = set()
+        for quote in quotes:
+            if not isinstance(quote, Quote):
+                quote = parse_quote(quote)
+            if self.month and not quote.date.startswith(self.month):
+                continue
+            day = days.get(quote.date)
+            if day is None:
+                day = days[quote.date] = DayFare(quote.date, quote.date_label)
+            old = day.quotes.get(quote.id)
+            if old is not None and old.raw_price == quote.raw_price and old.direct == quote.direct:
+                continue
+            day.quotes[quote.id] = quote
+            changed.add(quote.date)
+        if replace:
+            # Built aside and swapped in whole, readers never see a half-refreshed month
+            changed = {d for d in self.days.keys() | days.keys() if _fares(self.days.get(d)) != _fares(days.get(d))}
+            for day in days.values():
+                day.refresh()
+            self.days = days
+        else:
+            for date in changed:
+                days[date].refresh()
+        if changed:
+            self._index.clear()
+        self.updated = time.time()
+        return len(changed)
+
+    @property
+    def stale(self):
+        return time.time() - self.updated > MONTH_TTL
+
+    def _sorted(self, direct):
+        """(prices, days) ordered by price then date, rebuilt lazily after updates."""
+        if direct not in self._index:
+            fares = []
+            for day in self.days.values():
+                quote = day.cheapest_direct if direct else day.cheapest
+                if quote is not None:
+                    fares.append((quote.raw_price, day.date, day))
+            fares.sort(key=lambda f: (f[0], f[1]))
+            self._index[direct] = ([f[0] for f in fares], [f[2] for f in fares])
+        return self._index[direct]
+
+    def cheapest(self, n=1, direct=False):
+        """The n cheapest days, as DayFare objects."""
+        return self._sorted(direct)[1][:n]
+
+    def under(self, max_price, direct=False):
+        """Every day with a fare at or below max_price, cheapest first."""
+        prices, days = self._sorted(direct)
+        return days[: bisect.bisect_right(prices, max_price)]
+
+    def day(self, date):
+        return self.days.get(date)
+
+    def __len__(self):
+        return len(self.days)
+
+
+_calendars = OrderedDict()
+_lock = threading.Lock()
+
+
+def _key(params):
+    norm = normalize_params(params)
+    return (norm.get("fromEntityId"), norm.get("toEntityId"), norm.get("wholeMonthDepart"))
+
+
+def calendar_for(params):
+    """The cached calendar for a whole-month search, or None if missing or stale."""
+    with _lock:
+        calendar = _calendars.get(_key(params))
+        if calendar is None or calendar.stale:
+            return None
+        _calendars.move_to_end(_key(params))
+        return calendar
+
+
+def update_calendar(params, quotes, complete=True):
+    """
+    Fold a whole-month search's quotes into its route-month calendar: a
+    complete search replaces the month, a cut-short one is merged in.
+    """
+    key = _key(params)
+    with _lock:
+        calendar = _calendars.get(key)
+        if calendar is None:
+            calendar = _calendars[key] = FareCalendar(*key)
+            while len(_calendars) > MAX_CALENDARS:
+                _calendars.popitem(last=False)
+        _calendars.move_to_end(key)
+        calendar.update(quotes, replace=complete)
+        return calendar
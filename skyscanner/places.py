@@ -0,0 +1,216 @@
+"""
+Local place index: city names, airport names and IATA codes resolved to
+Skyscanner skyId/entityId in-process instead of an auto-complete call.
+
+Seeded from places.json next to this file and grown from auto-complete
+responses with PlaceIndex.learn(); save() writes it back.
+"""
+
+import os, re, json, bisect, difflib, threading
+
+PLACES_PATH = os.getenv(
+    "SKY_SCANNER_PLACES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "places.json")
+)
+# difflib similarity a misspelt name needs to resolve
+FUZZY_CUTOFF = float(os.getenv("SKY_SCANNER_PLACES_FUZZY_CUTOFF", "0.8"))
+# Shorter prefixes match too much to resolve on their own
+MIN_PREFIX = 3
+
+PLACE_PARAMS = ("fromEntityId", "toEntityId")
+_IATA = re.compile(r"[A-Z]{3}")
+
+
+def normalize(text):
+    return " ".join(re.sub(r"[^\w ]", " ", text.lower()).split())
+
+
+class Place:
+    __slots__ = ("sky_id", "entity_id", "name", "city", "city_entity_id", "country", "kind", "aliases")
+
+    def __init__(self, sky_id, entity_id=None, name=None, city=None, city_entity_id=None, country=None, kind="AIRPORT", aliases=()):
+        self.sky_id = sky_id.upper()
+        self.entity_id = entity_id
+        self.name = (name or "").strip() or None
+        self.city = (city or "").strip() or None
+        self.city_entity_id = city_entity_id
+        self.country = country
+        self.kind = kind
+        self.aliases = list(aliases)
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            d["skyId"], d.get("entityId"), d.get("name"), d.get("city"),
+            d.get("cityEntityId"), d.get("country"), d.get("type", "AIRPORT"), d.get("aliases", ()),
+        )
+
+    def to_dict(self):
+        return {
+            "skyId": self.sky_id,
+            "entityId": self.entity_id,
+            "name": self.name,
+            "city": self.city,
+            "cityEntityId": self.city_entity_id,
+            "country": self.country,
+            "type": self.kind,
+            "aliases": self.aliases,
+        }
+
+    def names(self):
+        """Every normalised name this place answers to, city and aliases first."""
+        found = [self.city, *self.aliases, self.name, self.sky_id]
+        return list(dict.fromkeys(normalize(n) for n in found if n))
+
+    def __repr__(self):
+        return f"Place({self.sky_id}, {self.city or self.name})"
+
+
+class PlaceIndex:
+    """
+    Exact lookups by code, name or entityId are dict hits; prefixes use a
+    sorted name list and misspellings fall back to difflib. Resolutions are
+    memoised, so a repeated one is a single dict lookup.
+    """
+
+    def __init__(self, places=()):
+        self.places = {}  # skyId -> Place
+        self._entities = {}  # entityId -> Place
+        self._names = {}  # normalised name -> Place
+        self._sorted = []
+        self._resolved = {}
+        self._lock = threading.Lock()
+        for place in places:
+            self.add(place)
+
+    def add(self, place):
+        """Add a place, or merge it into the one with the same skyId."""
+        with self._lock:
+            known = self.places.get(place.sky_id)
+            if known is None:
+                known = self.places[place.sky_id] = place
+            else:
+                for field in ("entity_id", "city", "city_entity_id", "country"):
+                    if getattr(place, field) and not getattr(known, field):
+                        setattr(known, field, getattr(place, field))
+                extra = [n for n in (place.name, place.city, *place.aliases) if n]
+                known.aliases += [n for n in extra if normalize(n) not in known.names()]
+            if known.entity_id:
+                self._entities[known.entity_id] = known
+            if known.city_entity_id:
+                self._entities.setdefault(known.city_entity_id, known)
+            for name in known.names():
+                self._names.setdefault(name, known)
+            self._sorted = sorted(self._names)
+            self._resolved.clear()
+            return known
+
+    def learn(self, payload):
+        """Index the places in an auto-complete response; returns how many it had."""
+        count = 0
+        for entry in payload.get("data") or []:
+            presentation = entry.get("presentation") or {}
+            navigation = entry.get("navigation") or {}
+            flight = navigation.get("relevantFlightParams") or {}
+            hotel = navigation.get("relevantHotelParams") or {}
+            sky_id = flight.get("skyId") or presentation.get("skyId")
+            if not sky_id:
+                continue
+            self.add(
+                Place(
+                    sky_id,
+                    flight.get("entityId") or navigation.get("entityId"),
+                    presentation.get("title"),
+                    hotel.get("localizedName") if hotel.get("entityType") == "CITY" else None,
+                    hotel.get("entityId") if hotel.get("entityType") == "CITY" else None,
+                    presentation.get("subtitle"),
+                    flight.get("flightPlaceType") or navigation.get("entityType") or "AIRPORT",
+                )
+            )
+            count += 1
+        return count
+
+    def get(self, sky_id):
+        return self.places.get(sky_id.upper())
+
+    def by_entity_id(self, entity_id):
+        return self._entities.get(str(entity_id))
+
+    def complete(self, prefix, limit=5):
+        """Places with a name starting with prefix, in name order."""
+        prefix = normalize(prefix)
+        found = []
+        i = bisect.bisect_left(self._sorted, prefix)
+        while i < len(self._sorted) and self._sorted[i].startswith(prefix) and len(found) < limit:
+            place = self._names[self._sorted[i]]
+            if place not in found:
+                found.append(place)
+            i += 1
+        return found
+
+    def resolve(self, text):
+        """The one place text names (exact, unique prefix or close spelling), else None."""
+        key = normalize(text or "")
+        if key in self._resolved:
+            return self._resolved[key]
+        place = self._names.get(key)
+        if place is None and len(key) >= MIN_PREFIX:
+            matches = self.complete(key, limit=2)
+            if len(matches) == 1:
+                place = matches[0]
+            elif not matches:
+                close = difflib.get_close_matches(key, self._sorted, n=1, cutoff=FUZZY_CUTOFF)
+                place = self._names[close[0]] if close else None
+        self._resolved[key] = place
+        return place
+
+    def aliases(self):
+        """skyId -> lowercase city names and aliases, for the rule-based extractor."""
+        return {
+            place.sky_id: tuple(normalize(n) for n in (place.city, *place.aliases) if n)
+            for place in self.places.values()
+            if place.kind == "AIRPORT"
+        }
+
+    @classmethod
+    def load(cls, path=PLACES_PATH):
+        with open(path) as f:
+            return cls(Place.from_dict(d) for d in json.load(f))
+
+    def save(self, path=PLACES_PATH):
+        with self._lock:
+            data = [place.to_dict() for place in self.places.values()]
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+            f.write("\n")
+
+
+def resolve_code(text):
+    """skyId for a city, airport name or code; unknown codes written as such (GOI) pass through, else None."""
+    if not text:
+        return None
+    place = get_places().resolve(text)
+    if place is not None:
+        return place.sky_id
+    return text.strip() if _IATA.fullmatch(text.strip()) else None
+
+
+def resolve_params(params):
+    """A copy of search params with place names replaced by skyIds (unresolvable ones kept as given)."""
+    params = dict(params)
+    for key in PLACE_PARAMS:
+        if params.get(key):
+            params[key] = resolve_code(params[key]) or params[key]
+    return params
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_places():
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = PlaceIndex.load() if os.path.exists(PLACES_PATH) else PlaceIndex()
+    return _index
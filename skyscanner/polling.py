@@ -0,0 +1,305 @@
+"""
+Incremental search: poll an "incomplete" search-one-way session in the
+background and stream each new batch of results as it arrives
+"""
+
+import os, json, time, queue, threading
+from skyscanner.client import get_client, CHUNK_SIZE
+from skyscanner.stream import JsonStreamer
+from skyscanner.fare_calendar import update_calendar
+from skyscanner.coalesce import search_key, count
+from skyscanner.quota import INTERACTIVE, RateLimited
+from skyscanner.capture import get_capture, current_session, search_kind
+
+POLL_INTERVAL = float(os.getenv("SKY_SCANNER_POLL_INTERVAL", "0.5"))
+MAX_POLLS = int(os.getenv("SKY_SCANNER_MAX_POLLS", "10"))
+# Stop re-asking once this many polls in a row bring nothing new
+STABLE_POLLS = int(os.getenv("SKY_SCANNER_STABLE_POLLS", "2"))
+
+_DONE = object()
+
+# Searches still polling, by search_key, so identical ones started meanwhile can join them
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def error_body(response):
+    if response.status_code == 429:
+        return RateLimited(f"RapidAPI answered 429 ({response.text[:200]})")
+    try:
+        return response.json()
+    except ValueError:
+        return response.text
+
+
+def from_cache(response):
+    """Served from the response cache, fresh or stale; not worth storing again."""
+    return response.headers.get("X-Cache") in ("HIT", "STALE")
+
+
+class ResultSet:
+    """
+    Results accumulated across the polls of one search session, read
+    incrementally from each response. `parse(kind, item)` runs on every new
+    raw item as soon as it is decoded ("itineraries" or "quotes"); returning
+    None drops it. With keep_raw the item text is retained so the merged
+    payload can be cached. `responses` ((status, "hit"/"stale"/"miss") per response),
+    `bytes` and `parse_seconds` are kept for tracing.
+    """
+
+    def __init__(self, parse=None, keep_raw=True):
+        self.parse = parse
+        self.keep_raw = keep_raw
+        self.items = []
+        self.kind = None
+        self.values = {}
+        self._raw = []
+        self._seen = set()
+        self._streamer = None
+        self.responses = []
+        self.bytes = 0
+        self.parse_seconds = 0.0
+
+    def record(self, response):
+        """Note the status and cache status of one upstream response."""
+        cache = (response.headers.get("X-Cache") or "miss").lower()
+        self.responses.append((response.status_code, cache))
+
+    def start(self):
+        """Begin reading a new response body."""
+        self._streamer = JsonStreamer()
+
+    def feed(self, chunk):
+        """Consume a body chunk, returning the results not seen before."""
+        start = time.perf_counter()
+        self.bytes += len(chunk)
+        fresh = []
+        for kind, name, value, raw in self._streamer.feed(chunk):
+            if kind == "value":
+                self.values[name] = value
+                continue
+            self.kind = name
+            if value.get("id") in self._seen:
+                continue
+            self._seen.add(value.get("id"))
+            if self.keep_raw:
+                self._raw.append(raw)
+            if self.parse is not None:
+                value = self.parse(name, value)
+                if value is None:
+                    continue
+            fresh.append(value)
+        self.items.extend(fresh)
+        self.parse_seconds += time.perf_counter() - start
+        return fresh
+
+    @property
+    def seen(self):
+        """Distinct raw results read so far, before any parse filtering."""
+        return len(self._seen)
+
+    @property
+    def status(self):
+        return (self.values.get("context") or {}).get("status")
+
+    @property
+    def session_id(self):
+        return (self.values.get("context") or {}).get("sessionId")
+
+    def payload_text(self, session=True):
+        """
+        The merged results as a search-one-way shaped JSON document. With
+        session=False the sessionId is left out, so a cached copy of a search
+        cut short is served as is instead of polling an expired session.
+        """
+        context = self.values.get("context")
+        if not session and context:
+            context = {k: v for k, v in context.items() if k != "sessionId"}
+        items = "[" + ",".join(self._raw) + "]"
+        if self.kind == "quotes":
+            items = '"flightQuotes":{"results":' + items + "}"
+        else:
+            items = '"itineraries":' + items
+        data = f'"context":{json.dumps(context)},'
+        if "token" in self.values:
+            data += f'"token":{json.dumps(self.values["token"])},'
+        return '{"data":{' + data + items + '},"status":true,"message":"Successful"}'
+
+    @property
+    def payload(self):
+        return json.loads(self.payload_text())
+
+
+class IncrementalSearch:
+    """
+    Iterating yields lists of results not seen in earlier batches, as soon
+    as each one has been read off the socket. Once the session is complete
+    (or stable), `items` holds everything found, the shared cache is
+    refreshed with the merged payload, whole-month quotes are folded into
+    the route's fare calendar and, when capture is on, the payload is
+    queued for the capture writer. A non-200 first response body (or a
+    raised exception) is kept in `error` and ends the stream.
+
+    A search started while an identical one (same normalised params and
+    parser) is still polling joins it instead of going upstream: it gets
+    the results found so far as its first batch, then the same batches as
+    they arrive. `coalesced` tells which.
+    """
+
+    def __init__(
+        self,
+        params,
+        client=None,
+        parse=None,
+        keep_raw=None,
+        interval=POLL_INTERVAL,
+        max_polls=MAX_POLLS,
+        stable_polls=STABLE_POLLS,
+        coalesce=True,
+        priority=INTERACTIVE,
+    ):
+        self.params = params
+        self.priority = priority
+        self.client = client or get_client()
+        self.capture = get_capture()
+        # Threads don't inherit the caller's context, so take its label now
+        self._session = current_session()
+        self.interval = interval
+        self.max_polls = max_polls
+        self.stable_polls = stable_polls
+        self._error = None
+        self._polls = 0
+        self._queue = queue.Queue()
+        self._queues = [self._queue]
+        self._fan_lock = threading.Lock()
+        self._done = False
+        self._leader = self
+        self._key = search_key(params, parse) if coalesce else None
+        if keep_raw is None:
+            keep_raw = self.client.cache is not None or self.capture is not None
+        # Ready before it is registered: a follower may join (or wait) as soon as it is in _inflight
+        self._results = ResultSet(parse, keep_raw)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        with _inflight_lock:
+            leader = _inflight.get(self._key) if coalesce else None
+            if leader is not None and leader._join(self._queue):
+                self._leader = leader
+            else:
+                if coalesce:
+                    _inflight[self._key] = self
+                # Started under the lock too, so a follower's wait() never joins an unstarted thread
+                self._thread.start()
+        count(self.coalesced)
+
+    def __iter__(self):
+        while True:
+            batch = self._queue.get()
+            if batch is _DONE:
+                return
+            yield batch
+
+    def wait(self, timeout=None):
+        self._leader._thread.join(timeout)
+        return self.items
+
+    @property
+    def coalesced(self):
+        return self._leader is not self
+
+    @property
+    def error(self):
+        return self._leader._error
+
+    @property
+    def polls(self):
+        return self._leader._polls
+
+    @property
+    def items(self):
+        return self._leader._results.items
+
+    @property
+    def payload(self):
+        return self._leader._results.payload
+
+    @property
+    def results(self):
+        return self._leader._results
+
+    def _join(self, follower_queue):
+        """Attach another caller's queue; False once the stream has ended."""
+        with self._fan_lock:
+            if self._done:
+                return False
+            if self._results.items:
+                follower_queue.put(list(self._results.items))
+            self._queues.append(follower_queue)
+            return True
+
+    def _read(self, response):
+        """Stream one response into the result set, returning how many new results it had."""
+        before = self._results.seen
+        self._results.start()
+        for chunk in response.iter_content(CHUNK_SIZE):
+            # Under the fan-out lock so a joining search sees each item exactly once
+            with self._fan_lock:
+                fresh = self._results.feed(chunk)
+                if fresh:
+                    for q in self._queues:
+                        q.put(fresh)
+        return self._results.seen - before
+
+    def _run(self):
+        try:
+            response = self.client.search_one_way(stream=True, priority=self.priority, **self.params)
+            self._results.record(response)
+            if response.status_code != 200:
+                self._error = error_body(response)
+                return
+            self._read(response)
+            hit = from_cache(response)
+            results = self._results
+            if "context" not in results.values and results.kind is None:
+                self._error = results.values.get("message", "empty response")
+                return
+            sid = results.session_id
+            stable = added = 0
+            while (
+                results.status == "incomplete"
+                and sid
+                and self._polls < self.max_polls
+                and stable < self.stable_polls
+            ):
+                time.sleep(self.interval)
+                self._polls += 1
+                try:
+                    response = self.client.search_incomplete(sid, stream=True, priority=self.priority)
+                except RateLimited:
+                    # Keep what the earlier polls found
+                    break
+                results.record(response)
+                if response.status_code != 200:
+                    response.close()
+                    break
+                fresh = self._read(response)
+                added += fresh
+                stable = 0 if fresh else stable + 1
+            if results.kind == "quotes" and self.params.get("wholeMonthDepart"):
+                update_calendar(self.params, results.items, complete=results.status != "incomplete")
+            # A cached payload is only stored again when polling added to it, a failed
+            # poll must not renew a partial result's TTL
+            stored = added or not hit
+            if self.client.cache is not None and results.keep_raw and stored:
+                self.client.cache.put(self.params, results.payload_text(session=False).encode("utf-8"))
+            if self.capture is not None and results.keep_raw and stored:
+                self.capture.record(search_kind(self.params), self.params, results, self._session)
+        except Exception as e:
+            self._error = e
+        finally:
+            with _inflight_lock:
+                if _inflight.get(self._key) is self:
+                    del _inflight[self._key]
+            with self._fan_lock:
+                self._done = True
+                for q in self._queues:
+                    q.put(_DONE)
@@ -0,0 +1,203 @@
+"""
+Client-side RapidAPI budget: a token bucket for the plan's per-second
+limit, the monthly quota tracked from the x-ratelimit-* response headers,
+and priority ordering so interactive searches go before prefetch and
+background refresh whenever requests have to wait
+"""
+
+import os, time, heapq, asyncio, itertools, threading
+from collections import Counter
+
+INTERACTIVE, PREFETCH, BACKGROUND = 0, 1, 2
+
+RATE_LIMIT = float(os.getenv("SKY_SCANNER_RATE_LIMIT", "5"))  # requests per second, 0 disables
+BURST = int(os.getenv("SKY_SCANNER_RATE_BURST", str(max(int(RATE_LIMIT), 1))))
+# Known plan size; otherwise learnt from x-ratelimit-requests-remaining
+MONTHLY_QUOTA = int(os.getenv("SKY_SCANNER_MONTHLY_QUOTA", "0"))
+# Monthly requests held back for interactive searches
+QUOTA_RESERVE = int(os.getenv("SKY_SCANNER_QUOTA_RESERVE", "50"))
+# Longest a request waits for its turn before giving up
+MAX_WAIT = float(os.getenv("SKY_SCANNER_RATE_MAX_WAIT", "10"))
+# Pause after a 429 that doesn't say how long to wait
+DEFAULT_RETRY_AFTER = float(os.getenv("SKY_SCANNER_DEFAULT_RETRY_AFTER", "1"))
+# Without an x-ratelimit-requests-reset header, how long a used-up quota blocks
+# requests before they are let through again to learn the new count
+QUOTA_PROBE_INTERVAL = float(os.getenv("SKY_SCANNER_QUOTA_PROBE_INTERVAL", "3600"))
+
+
+class RateLimited(Exception):
+    """No request budget: the quota is used up or no slot came free in time."""
+
+
+def _seconds(value):
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Shared by the sync and async clients (they use the same API key).
+    Waiters queue by (priority, arrival); only the head of the queue may
+    take a token, so a backlog of prefetches never delays a user's search.
+    """
+
+    def __init__(
+        self,
+        rate=RATE_LIMIT,
+        burst=BURST,
+        monthly_quota=MONTHLY_QUOTA,
+        reserve=QUOTA_RESERVE,
+        max_wait=MAX_WAIT,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.tokens = float(burst)
+        self.limit = monthly_quota or None
+        self.remaining = monthly_quota or None
+        # When the quota period ends (monotonic), from the reset header or a probe interval
+        self.resets_at = None
+        self.blocked_until = 0.0
+        self.stats = Counter()
+        self._updated = time.monotonic()
+        self._waiting = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _check_quota(self, priority):
+        now = time.monotonic()
+        if self.resets_at is not None and now >= self.resets_at:
+            # A new period: assume the full plan until a response says otherwise
+            self.remaining = self.limit
+            self.resets_at = None
+        if self.remaining is None:
+            return
+        if self.remaining <= 0:
+            if self.resets_at is None:
+                # No request goes out while this holds, so no header could ever lift it
+                self.resets_at = now + QUOTA_PROBE_INTERVAL
+            raise RateLimited("monthly quota used up")
+        if priority > INTERACTIVE and self.remaining <= self.reserve:
+            raise RateLimited("monthly quota left is reserved for interactive searches")
+
+    def _enqueue(self, priority):
+        with self._cond:
+            try:
+                self._check_quota(priority)
+            except RateLimited:
+                self.stats["rejected"] += 1
+                raise
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiting, ticket)
+            return ticket
+
+    def _leave(self, ticket):
+        with self._cond:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self.stats["rejected"] += 1
+            self._cond.notify_all()
+
+    def _try(self, ticket):
+        """0 once a token is taken, else seconds until one might be (None: not this ticket's turn)."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._waiting[0] != ticket:
+            return None
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.rate > 0:
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+            self.tokens -= 1
+        heapq.heappop(self._waiting)
+        if self.remaining is not None:
+            self.remaining -= 1
+        self.stats["granted"] += 1
+        self._cond.notify_all()
+        return 0
+
+    def acquire(self, priority=INTERACTIVE, timeout=None):
+        """Block until this request may go out; raises RateLimited instead of waiting past timeout."""
+        deadline = time.monotonic() + (self.max_wait if timeout is None else timeout)
+        ticket = self._enqueue(priority)
+        try:
+            with self._cond:
+                while True:
+                    wait = self._try(ticket)
+                    if wait == 0:
+                        return
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        raise RateLimited("no request slot free in time")
+                    self.stats["waited"] += 1
+                    self._cond.wait(left if wait is None else min(wait, left))
+        finally:
+            self._leave(ticket)
+
+    async def aacquire(self, priority=INTERACTIVE, timeout=None):
+        """acquire() for the event loop: waits with asyncio.sleep instead of blocking."""
+        deadline = time.monotonic() + (self.max_wait if timeout is None else timeout)
+        ticket = self._enqueue(priority)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try(ticket)
+                if wait == 0:
+                    return
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    raise RateLimited("no request slot free in time")
+                self.stats["waited"] += 1
+                await asyncio.sleep(min(0.01 if wait is None else wait, left))
+        finally:
+            self._leave(ticket)
+
+    def update(self, status, headers):
+        """Learn the quota from a response and pause everyone after a 429."""
+        with self._cond:
+            limit = _seconds(headers.get("x-ratelimit-requests-limit"))
+            if limit is not None:
+                self.limit = int(limit)
+            remaining = _seconds(headers.get("x-ratelimit-requests-remaining"))
+            if remaining is not None:
+                self.remaining = int(remaining)
+            reset = _seconds(headers.get("x-ratelimit-requests-reset"))
+            if reset is not None:
+                self.resets_at = time.monotonic() + reset
+            if status == 429:
+                self.stats["throttled"] += 1
+                retry_after = _seconds(headers.get("Retry-After"))
+                pause = DEFAULT_RETRY_AFTER if retry_after is None else retry_after
+                self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+                self.tokens = 0.0
+            self._cond.notify_all()
+
+
+def describe(error):
+    """What the model is told about a failed search: quota trouble in plain words, anything else as is."""
+    if isinstance(error, RateLimited):
+        return (
+            f"the flight search service is busy ({error}) and there are no saved results "
+            "for this search. Ask the user to try again in a few minutes."
+        )
+    return str(error)
+
+
+_limiter = None
+_lock = threading.Lock()
+
+
+def get_limiter():
+    """The process-wide limiter, or None when SKY_SCANNER_RATE_LIMIT=0."""
+    global _limiter
+    if _limiter is None and RATE_LIMIT > 0:
+        with _lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
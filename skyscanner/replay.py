@@ -0,0 +1,216 @@
+"""
+Offline stand-in for RapidAPI: replays the payloads captured in the repo
+with configurable latency, jitter, error rate and "incomplete" sessions.
+With REPLAY_CAPTURE_DIR the newest capture of each kind (skyscanner/capture.py)
+is served instead.
+
+Mount it on the shared clients with install() / install_async(), or set
+SKY_SCANNER_REPLAY=1 to have get_client() do it.
+"""
+
+import os, io, gzip, json, time, random, asyncio, threading, itertools
+from urllib.parse import urlsplit, parse_qs
+import requests
+from requests.adapters import BaseAdapter
+from urllib3.response import HTTPResponse
+from skyscanner.client import (
+    BASE_URL,
+    SEARCH_ONE_WAY,
+    SEARCH_INCOMPLETE,
+    FLIGHT_DETAIL,
+    AUTO_COMPLETE,
+)
+from skyscanner import capture
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = {
+    "date": os.path.join(ROOT, "api_testing", "one_way_flight_output.json"),
+    "month": os.path.join(ROOT, "response.json"),
+    "detail": os.path.join(ROOT, "api_testing", "flight_details_output.json"),
+    "auto_complete": os.path.join(ROOT, "api_testing", "autocomplete_loc_codes_output.json"),
+}
+CAPTURE_DIR = os.getenv("REPLAY_CAPTURE_DIR")
+
+LATENCY_MS = float(os.getenv("REPLAY_LATENCY_MS", "0"))
+JITTER_MS = float(os.getenv("REPLAY_JITTER_MS", "0"))
+ERROR_RATE = float(os.getenv("REPLAY_ERROR_RATE", "0"))
+INCOMPLETE_POLLS = int(os.getenv("REPLAY_INCOMPLETE_POLLS", "0"))
+# Plan size reported in x-ratelimit-* headers, 0 leaves them out
+MONTHLY_QUOTA = int(os.getenv("REPLAY_MONTHLY_QUOTA", "0"))
+
+_SESSION = "__REPLAY_SESSION__"
+
+
+def _load(path):
+    with (gzip.open if path.endswith(".gz") else open)(path, "rt", encoding="utf-8") as f:
+        payload = json.load(f)
+    payload.pop("capture", None)
+    return payload
+
+
+def captured_fixtures(directory, fallback=FIXTURES):
+    """FIXTURES with each kind replaced by its newest capture in directory, where there is one."""
+    return {kind: capture.latest(kind, directory) or path for kind, path in fallback.items()}
+
+
+class Replayer:
+    """
+    Transport-independent core: maps a request path + params to
+    (status, body bytes, headers) and a delay to apply before answering.
+    Exact-date searches are split into `incomplete_polls + 1` growing pages,
+    each search gets its own session id so concurrent sessions don't mix.
+    """
+
+    def __init__(
+        self,
+        latency_ms=LATENCY_MS,
+        jitter_ms=JITTER_MS,
+        error_rate=ERROR_RATE,
+        incomplete_polls=INCOMPLETE_POLLS,
+        fixtures=None,
+        seed=None,
+        monthly_quota=MONTHLY_QUOTA,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.incomplete_polls = incomplete_polls
+        self.monthly_quota = monthly_quota
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self._sessions = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+        fixtures = fixtures or (captured_fixtures(CAPTURE_DIR) if CAPTURE_DIR else FIXTURES)
+        self.month = json.dumps(_load(fixtures["month"])).encode("utf-8")
+        self.detail = json.dumps(_load(fixtures["detail"])).encode("utf-8")
+        self.auto_complete = json.dumps(_load(fixtures["auto_complete"])).encode("utf-8")
+        self.pages = self._pages(_load(fixtures["date"]))
+
+    def _pages(self, payload):
+        """Pre-serialised growing pages so the mock itself costs ~nothing per call."""
+        itineraries = payload["data"]["itineraries"]
+        steps = self.incomplete_polls + 1
+        pages = []
+        for step in range(1, steps + 1):
+            page = json.loads(json.dumps(payload))
+            page["data"]["itineraries"] = itineraries[: len(itineraries) * step // steps]
+            page["data"]["context"]["status"] = "complete" if step == steps else "incomplete"
+            page["data"]["context"]["sessionId"] = _SESSION
+            pages.append(json.dumps(page).encode("utf-8"))
+        return pages
+
+    def delay(self):
+        jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(self.latency_ms + jitter, 0) / 1000
+
+    def _page(self, session, step):
+        return self.pages[min(step, len(self.pages) - 1)].replace(
+            _SESSION.encode(), session.encode()
+        )
+
+    def respond(self, path, params):
+        status, body, headers = self._respond(path, params)
+        if self.monthly_quota:
+            headers = {
+                **headers,
+                "x-ratelimit-requests-limit": str(self.monthly_quota),
+                "x-ratelimit-requests-remaining": str(max(self.monthly_quota - self.requests, 0)),
+            }
+        return status, body, headers
+
+    def _respond(self, path, params):
+        with self._lock:
+            self.requests += 1
+            if self.monthly_quota and self.requests > self.monthly_quota:
+                self.errors += 1
+                return 429, b'{"message":"You have exceeded the MONTHLY quota for Requests on your current plan"}', {}
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.errors += 1
+                return 429, b'{"message":"Too many requests"}', {"Retry-After": "0"}
+            if path == SEARCH_ONE_WAY:
+                if params.get("wholeMonthDepart") or not params.get("departDate"):
+                    return 200, self.month, {}
+                session = f"replay-{next(self._ids)}"
+                self._sessions[session] = 0
+                return 200, self._page(session, 0), {}
+            if path == SEARCH_INCOMPLETE:
+                session = params.get("sessionId", "")
+                if session not in self._sessions:
+                    return 404, b'{"message":"Unknown session"}', {}
+                self._sessions[session] += 1
+                step = self._sessions[session]
+                if step >= len(self.pages) - 1:
+                    del self._sessions[session]
+                return 200, self._page(session, step), {}
+            if path == FLIGHT_DETAIL:
+                return 200, self.detail, {}
+            if path == AUTO_COMPLETE:
+                return 200, self.auto_complete, {}
+            return 404, b'{"message":"Endpoint does not exist"}', {}
+
+
+def _split(url):
+    parts = urlsplit(url)
+    return parts.path, {k: v[0] for k, v in parse_qs(parts.query).items()}
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    requests transport adapter backed by a Replayer. It replaces the pooled
+    HTTPAdapter, so urllib3-level retries are not exercised; injected
+    errors reach the caller as-is.
+    """
+
+    def __init__(self, replayer):
+        super().__init__()
+        self.replayer = replayer
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        path, params = _split(request.url)
+        status, body, headers = self.replayer.respond(path, params)
+        time.sleep(self.replayer.delay())
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update({"Content-Type": "application/json", **headers})
+        response.raw = HTTPResponse(
+            body=io.BytesIO(body), status=status, preload_content=False
+        )
+        response.url = request.url
+        response.request = request
+        response.encoding = "utf-8"
+        return response
+
+    def close(self):
+        pass
+
+
+def install(client, replayer=None):
+    """Route a SkyScannerClient through the replayer. Returns the replayer."""
+    replayer = replayer or Replayer()
+    client.session.mount(BASE_URL, ReplayAdapter(replayer))
+    return replayer
+
+
+def install_async(client, replayer=None):
+    """Route an AsyncSkyScannerClient through the replayer. Returns the replayer."""
+    import httpx
+
+    replayer = replayer or Replayer()
+
+    async def handler(request):
+        path, params = _split(str(request.url))
+        status, body, headers = replayer.respond(path, params)
+        await asyncio.sleep(replayer.delay())
+        return httpx.Response(
+            status, content=body, headers={"Content-Type": "application/json", **headers}
+        )
+
+    client.http = httpx.AsyncClient(
+        base_url=client.http.base_url,
+        headers=client.http.headers,
+        transport=httpx.MockTransport(handler),
+    )
+    return replayer
@@ -0,0 +1,187 @@
+"""
+Compact itinerary / quote model and a single-pass extractor for
+search-one-way payloads
+"""
+
+import json
+
+CARRIER = "IndiGo"
+
+
+class Leg:
+    __slots__ = (
+        "origin",
+        "destination",
+        "duration",
+        "departure",
+        "arrival",
+        "carrier",
+        "flight_number",
+    )
+
+    def __init__(self, origin, destination, duration, departure, arrival, carrier, flight_number):
+        self.origin = origin
+        self.destination = destination
+        self.duration = duration
+        self.departure = departure
+        self.arrival = arrival
+        self.carrier = carrier
+        self.flight_number = flight_number
+
+
+class Itinerary:
+    __slots__ = ("id", "price", "raw_price", "legs")
+
+    def __init__(self, id, price, raw_price, legs):
+        self.id = id
+        self.price = price
+        self.raw_price = raw_price
+        self.legs = legs
+
+    def rows(self):
+        """One flat row per leg, the shape the chat tools have always returned."""
+        return [
+            {
+                "price": self.price,
+                "rawPrice": self.raw_price,
+                "origin": leg.origin,
+                "destination": leg.destination,
+                "duration": leg.duration,
+                "departure": leg.departure,
+                "arrival": leg.arrival,
+                "carrier": leg.carrier,
+                "flight_number": leg.flight_number,
+            }
+            for leg in self.legs
+        ]
+
+
+class Quote:
+    __slots__ = (
+        "id",
+        "price",
+        "raw_price",
+        "direct",
+        "origin",
+        "destination",
+        "date",
+        "date_label",
+    )
+
+    def __init__(self, id, price, raw_price, direct, origin, destination, date, date_label):
+        self.id = id
+        self.price = price
+        self.raw_price = raw_price
+        self.direct = direct
+        self.origin = origin
+        self.destination = destination
+        self.date = date
+        self.date_label = date_label
+
+    def rows(self):
+        return [
+            {
+                "price": self.price,
+                "rawPrice": self.raw_price,
+                "direct": self.direct,
+                "originAirport": self.origin,
+                "destinationAirport": self.destination,
+                "departureDate": self.date,
+                "departureDateLabel": self.date_label,
+            }
+        ]
+
+
+def parse_leg(leg, carrier=CARRIER):
+    """Build a Leg, or return None without allocating if the carrier doesn't match."""
+    name = leg["carriers"]["marketing"][0]["name"]
+    if carrier is not None and name != carrier:
+        return None
+    return Leg(
+        leg["origin"]["name"],
+        leg["destination"]["name"],
+        leg["durationInMinutes"],
+        leg["departure"],
+        leg["arrival"],
+        name,
+        leg["segments"][0]["flightNumber"],
+    )
+
+
+def parse_itinerary(itinerary, carrier=CARRIER):
+    legs = []
+    for leg in itinerary["legs"]:
+        leg = parse_leg(leg, carrier)
+        if leg is not None:
+            legs.append(leg)
+    if not legs:
+        return None
+    price = itinerary["price"]
+    return Itinerary(itinerary["id"], price["formatted"], price.get("raw"), legs)
+
+
+def parse_itineraries(itineraries, carrier=CARRIER):
+    out = []
+    for itinerary in itineraries:
+        itinerary = parse_itinerary(itinerary, carrier)
+        if itinerary is not None:
+            out.append(itinerary)
+    return out
+
+
+def parse_quote(flight_quote):
+    content = flight_quote["content"]
+    outbound = content["outboundLeg"]
+    return Quote(
+        flight_quote["id"],
+        content["price"],
+        content.get("rawPrice"),
+        content["direct"],
+        outbound["originAirport"]["name"],
+        outbound["destinationAirport"]["name"],
+        outbound["localDepartureDate"],
+        outbound["localDepartureDateLabel"],
+    )
+
+
+def parse_quotes(results):
+    return [parse_quote(flight_quote) for flight_quote in results]
+
+
+def dumps(obj):
+    """Compact JSON: no padding and raw UTF-8 so the rupee sign stays one char."""
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def parser(carrier=CARRIER):
+    """Per-item callback for ResultSet: filter and slim each raw item as it is decoded."""
+
+    def parse(kind, item):
+        if kind == "quotes":
+            return parse_quote(item)
+        return parse_itinerary(item, carrier)
+
+    # Equal keys produce equal items, so identical searches can be coalesced
+    parse.key = ("parser", carrier)
+    return parse
+
+
+def format_results(items, departDate=None, wholeMonthDepart=None):
+    """Serialise parsed Itinerary/Quote objects for the model."""
+    flight_info = []
+    for item in items:
+        flight_info.extend(item.rows())
+    # If the user wants to search for a specific date
+    if (wholeMonthDepart is None) and (departDate is not None):
+        return dumps({"flight_info": flight_info, "isWholeMonthDepart": False})
+    # If the user wants to search for the whole month
+    return dumps({"flight_info": flight_info, "isWholeMonthDepart": True})
+
+
+def flight_results(response_dict, departDate=None, wholeMonthDepart=None, carrier=CARRIER):
+    """Same as format_results, starting from an already decoded payload."""
+    if (wholeMonthDepart is None) and (departDate is not None):
+        items = parse_itineraries(response_dict["data"]["itineraries"], carrier)
+    else:
+        items = parse_quotes(response_dict["data"]["flightQuotes"]["results"])
+    return format_results(items, departDate, wholeMonthDepart)
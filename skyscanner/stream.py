@@ -0,0 +1,148 @@
+"""
+Incremental JSON reader for Skyscanner payloads.
+
+Feeds raw socket chunks and emits every element of the result arrays
+(data.itineraries, data.flightQuotes.results) as soon as the element is
+complete, plus a few small values (context, token, message), so callers
+never hold the whole object tree of a large page.
+"""
+
+import re, json, codecs
+
+ITEM_PATHS = {
+    ("data", "itineraries"): "itineraries",
+    ("data", "flightQuotes", "results"): "quotes",
+}
+VALUE_PATHS = {
+    ("data", "context"): "context",
+    ("data", "token"): "token",
+    ("message",): "message",
+}
+
+_STRUCT = re.compile(r'[{}\[\],:"]')
+_STRING_END = re.compile(r'["\\]')
+_decode = json.JSONDecoder().raw_decode
+
+
+class JsonStreamer:
+    """
+    Structural scanner for the envelope (nesting, object keys, strings);
+    captured elements and values are decoded in one C-level raw_decode
+    call once their closing byte has arrived. Captured values must be
+    objects, arrays or strings.
+    """
+
+    def __init__(self, items=ITEM_PATHS, values=VALUE_PATHS):
+        self.items = items
+        self.values = values
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.stack = []  # [container char, current key]
+        self.expect_key = False
+        self.in_str = False
+        self.str_start = 0
+        self.str_is_key = False
+        self.item_name = None  # set while inside a result array
+        self.item_depth = None
+        self.pending = None  # (kind, name, start) waiting for more data
+
+    def _path(self):
+        return tuple(key if kind == "{" else "*" for kind, key in self.stack)
+
+    def feed(self, chunk):
+        """
+        Consume a chunk, returning [(kind, name, value, raw text)] for every
+        capture completed by it. kind is "item" or "value".
+        """
+        buf = self.buf = self.buf + self.decoder.decode(chunk)
+        pos = self.pos
+        events = []
+        if self.pending:
+            pos = self._capture(events, *self.pending)
+            if self.pending:
+                return events
+        while True:
+            if self.in_str:
+                m = _STRING_END.search(buf, pos)
+                if m is None:
+                    pos = len(buf)
+                    break
+                if m.group() == "\\":
+                    if m.end() >= len(buf):
+                        pos = m.start()
+                        break
+                    pos = m.end() + 1
+                    continue
+                self.in_str = False
+                pos = m.end()
+                if self.str_is_key:
+                    self.stack[-1][1] = buf[self.str_start + 1 : pos - 1]
+                continue
+
+            m = _STRUCT.search(buf, pos)
+            if m is None:
+                pos = len(buf)
+                break
+            c = m.group()
+            start = m.start()
+            pos = m.end()
+            if c == '"' and self.expect_key and self.stack[-1][0] == "{":
+                self.in_str = True
+                self.str_is_key = True
+                self.str_start = start
+            elif c in '{["':
+                depth = len(self.stack)
+                path = self._path()
+                if self.item_depth is not None and depth == self.item_depth:
+                    pos = self._capture(events, "item", self.item_name, start)
+                elif path in self.values:
+                    pos = self._capture(events, "value", self.values[path], start)
+                elif c == '"':
+                    self.in_str = True
+                    self.str_is_key = False
+                    self.str_start = start
+                else:
+                    if c == "[" and path in self.items:
+                        self.item_name = self.items[path]
+                        self.item_depth = depth + 1
+                    self.stack.append([c, None])
+                    self.expect_key = c == "{"
+                if self.pending:
+                    break
+            elif c in "}]":
+                self.stack.pop()
+                self.expect_key = False
+                if self.item_depth is not None and len(self.stack) < self.item_depth:
+                    self.item_depth = None
+                    self.item_name = None
+            elif c == ",":
+                self.expect_key = self.stack[-1][0] == "{"
+            else:  # :
+                self.expect_key = False
+
+        # Drop everything no pending capture or string still needs
+        keep = pos
+        if self.in_str:
+            keep = min(keep, self.str_start)
+        if keep:
+            self.buf = buf[keep:]
+            pos -= keep
+            self.str_start -= keep
+            if self.pending:
+                kind, name, start = self.pending
+                self.pending = (kind, name, start - keep)
+        self.pos = pos
+        return events
+
+    def _capture(self, events, kind, name, start):
+        try:
+            value, end = _decode(self.buf, start)
+        except json.JSONDecodeError:
+            # Element not fully received yet, retry on the next chunk
+            self.pending = (kind, name, start)
+            return start
+        self.pending = None
+        events.append((kind, name, value, self.buf[start:end]))
+        self.expect_key = False
+        return end